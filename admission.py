@@ -0,0 +1,182 @@
+# admission.py
+
+import os
+import json
+import math
+import time
+import threading
+from collections import OrderedDict
+
+import metrics
+
+
+
+#   ADMISSION LIMITS
+#
+#   Every render request is charged against a token bucket per client (API key
+#   if it is one of API_KEYS, else client IP) and against a global cap of
+#   renders in flight. Unknown keys count as the IP, so inventing a new key
+#   per request doesn't buy a fresh bucket. The other POSTs under /resume
+#   (layout pass, photo upload) take milliseconds and are polled while the
+#   user types, they only draw on a separate, much larger bucket per client.
+#   Both are checked before the body is read, rejected calls get a 429. Live
+#   preview sockets never pass through HTTP middleware, they charge each
+#   render they start against the same shared Admission instead.
+
+
+RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS", "2"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "10"))
+MAX_CONCURRENT_RENDERS = int(os.getenv("MAX_CONCURRENT_RENDERS", "16"))
+MAX_TRACKED_CLIENTS = 10000
+
+LIGHT_RATE_LIMIT_RPS = float(os.getenv("LIGHT_RATE_LIMIT_RPS", "20"))
+LIGHT_RATE_LIMIT_BURST = float(os.getenv("LIGHT_RATE_LIMIT_BURST", "40"))
+
+API_KEY_HEADER = b"x-api-key"
+API_KEYS = frozenset(key.strip() for key in os.getenv("API_KEYS", "").split(",") if key.strip())
+
+# POSTs to these paths run a render (PDF or preview thumbnails), any other
+# POST under LIGHT_PATH_PREFIX is charged to the light bucket only
+RENDER_PATHS = frozenset({"/resume", "/resume/previews"})
+LIGHT_PATH_PREFIX = "/resume/"
+
+
+
+#   TOKEN BUCKETS
+
+
+class TokenBuckets:
+
+    def __init__(self, rate=RATE_LIMIT_RPS, burst=RATE_LIMIT_BURST, max_clients=MAX_TRACKED_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.buckets = OrderedDict()  # client -> (tokens, last refill), oldest first
+        self.lock = threading.Lock()
+
+    def take(self, client):
+        # -> 0 if admitted, else seconds until a token is available
+        now = time.monotonic()
+        with self.lock:
+            tokens, last = self.buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate
+            self.buckets[client] = (tokens, now)
+            while len(self.buckets) > self.max_clients:
+                # forgotten clients come back with a full bucket
+                self.buckets.popitem(last=False)
+        return wait
+
+
+
+#   ADMISSION (buckets + global cap, shared by HTTP and live preview renders)
+
+
+class Admission:
+
+    def __init__(self, buckets=None, light_buckets=None, max_concurrent=MAX_CONCURRENT_RENDERS, api_keys=API_KEYS):
+        self.buckets = buckets or TokenBuckets()
+        self.light_buckets = light_buckets or TokenBuckets(LIGHT_RATE_LIMIT_RPS, LIGHT_RATE_LIMIT_BURST)
+        self.api_keys = api_keys
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0  # only touched from the event loop
+
+    def admit(self, scope):
+        # -> (None, 0) if admitted, release() once done; else (reason, retry after)
+        wait = self.buckets.take(self.client_key(scope))
+        if wait:
+            metrics.incr("admission_rejected_rate_limit")
+            return "Rate limit exceeded", wait
+
+        if self.in_flight >= self.max_concurrent:
+            metrics.incr("admission_rejected_concurrency")
+            return "Too many renders in progress", 1
+
+        self.in_flight += 1
+        metrics.set_gauge("renders_in_flight", self.in_flight)
+        return None, 0
+
+    def admit_light(self, scope):
+        # -> (None, 0) if admitted (nothing to release); else (reason, retry after)
+        wait = self.light_buckets.take(self.client_key(scope))
+        if wait:
+            metrics.incr("admission_rejected_rate_limit")
+            return "Rate limit exceeded", wait
+        return None, 0
+
+    def release(self):
+        self.in_flight -= 1
+        metrics.set_gauge("renders_in_flight", self.in_flight)
+
+    def client_key(self, scope):
+        for name, value in scope["headers"]:
+            if name == API_KEY_HEADER:
+                key = value.decode("latin-1")
+                if key in self.api_keys:
+                    return "key:" + key
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+
+
+admission = Admission()
+
+
+
+#   ADMISSION MIDDLEWARE (pure ASGI, runs before the body is read)
+
+
+class AdmissionControlMiddleware:
+
+    def __init__(self, app, admission=admission):
+        self.app = app
+        self.admission = admission
+
+    async def __call__(self, scope, receive, send):
+        kind = self.request_kind(scope)
+        if kind is None:
+            await self.app(scope, receive, send)
+            return
+
+        if kind == "light":
+            reason, retry_after = self.admission.admit_light(scope)
+        else:
+            reason, retry_after = self.admission.admit(scope)
+        if reason:
+            await self.reject(send, reason, retry_after)
+            return
+        if kind == "light":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.admission.release()
+
+    @staticmethod
+    def request_kind(scope):
+        # -> "render", "light" or None (not charged)
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return None
+        if scope["path"] in RENDER_PATHS:
+            return "render"
+        if scope["path"].startswith(LIGHT_PATH_PREFIX):
+            return "light"
+        return None
+
+    async def reject(self, send, detail, retry_after):
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
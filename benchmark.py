@@ -0,0 +1,130 @@
+# benchmark.py
+#
+# python benchmark.py [--iterations 20] [--profiles]
+
+import io
+import os
+import re
+import time
+import shutil
+import argparse
+
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4
+
+import templates
+from templates import TEMPLATE_PLANS, OUTPUT_PROFILES, render_plan, generate_resume
+
+
+
+#   SAMPLE PAYLOAD (multi-page for every template)
+
+
+SAMPLE_DATA = {
+    "full_name": "Jane Doe",
+    "job_role": "Senior Software Engineer",
+    "email": "jane.doe@example.com",
+    "phone": "+1 555 123 4567",
+    "skills": "Python, Go, SQL, Kubernetes, Terraform, AWS, GCP, Docker, Kafka, Redis",
+    "languages": "English, French, German",
+    "certifications": "AWS Solutions Architect Professional\nCertified Kubernetes Administrator",
+    "profile_summary": "Engineer with ten years of experience building data platforms. " * 6,
+    "work_experience": (
+        "Led a team of engineers building scalable data pipelines and public APIs "
+        "serving millions of requests per day. " * 10 + "\n"
+    ) * 6,
+    "education": "BSc Computer Science, Massachusetts Institute of Technology, 2010",
+    "interests": "Climbing, chess, photography, open source",
+}
+
+STREAM_RE = re.compile(rb"<<([^>]*)>>\s*stream\r?\n(.*?)endstream", re.S)
+
+
+
+#   MEASUREMENT
+
+
+def content_stream_bytes(pdf_bytes):
+    # page content streams only: skip embedded font files and form XObjects
+    total = 0
+    for head, body in STREAM_RE.findall(pdf_bytes):
+        if b"/Length1" in head or b"/Subtype" in head:
+            continue
+        total += len(body)
+    return total
+
+
+def run_template(plan, data, iterations, batch):
+    templates.BATCH_TEXT = batch
+    paint_time = 0.0
+    pdf_bytes = b""
+
+    for _ in range(iterations):
+        buf = io.BytesIO()
+        c = canvas.Canvas(buf, pagesize=A4, pageCompression=0, invariant=1)
+        t0 = time.perf_counter()
+        render_plan(c, plan, data)
+        paint_time += time.perf_counter() - t0
+        c.save()
+        pdf_bytes = buf.getvalue()
+
+    return {
+        "paint_ms": paint_time / iterations * 1000,
+        "stream_bytes": content_stream_bytes(pdf_bytes),
+        "pdf_bytes": len(pdf_bytes),
+    }
+
+
+def profile_sizes(plan, data):
+    sizes = {}
+    for name in OUTPUT_PROFILES:
+        path = generate_resume(plan, data, profile_name=name)
+        sizes[name] = os.path.getsize(path)
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+    return sizes
+
+
+def report_profiles():
+    # sizes depend heavily on the fonts: embedded TTF programs dwarf the page
+    # streams, so only a run with the production fonts gives real numbers
+    ttf = sum(plan["font"] in templates.FONT_METRICS.ttf_fonts for plan in TEMPLATE_PLANS)
+    print(f"fonts: {ttf} of {len(TEMPLATE_PLANS)} templates on embedded TTFs from {templates.FONTS_DIR}")
+    names = list(OUTPUT_PROFILES)
+    print(f"{'template':<10}" + "".join(f"{name:>10}" for name in names) + f"{'saved':>10}")
+    for number, plan in enumerate(TEMPLATE_PLANS, start=1):
+        sizes = profile_sizes(plan, SAMPLE_DATA)
+        smallest = min(sizes.values())
+        saved = 1 - smallest / sizes["default"]
+        print(f"{number:<10}" + "".join(f"{sizes[name]:>10}" for name in names) + f"{saved:>10.1%}")
+    if templates.pikepdf is None:
+        print("(pikepdf not installed: 'web' profile is not linearized)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark resume rendering")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--profiles", action="store_true", help="report PDF bytes per output profile")
+    args = parser.parse_args()
+
+    if args.profiles:
+        report_profiles()
+        return
+
+    print(f"{'template':<10}{'mode':<10}{'paint ms':>10}{'stream B':>12}{'pdf B':>10}")
+    for number, plan in enumerate(TEMPLATE_PLANS, start=1):
+        legacy = run_template(plan, SAMPLE_DATA, args.iterations, batch=False)
+        batched = run_template(plan, SAMPLE_DATA, args.iterations, batch=True)
+
+        for mode, result in (("per-line", legacy), ("batched", batched)):
+            print(f"{number:<10}{mode:<10}{result['paint_ms']:>10.2f}"
+                  f"{result['stream_bytes']:>12}{result['pdf_bytes']:>10}")
+
+        saved = 1 - batched["stream_bytes"] / legacy["stream_bytes"]
+        speedup = legacy["paint_ms"] / batched["paint_ms"]
+        print(f"{'':<10}{'delta':<10}{speedup:>9.2f}x{saved:>11.1%}")
+
+    templates.BATCH_TEXT = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+# bulk_render.py
+#
+# python bulk_render.py candidates.jsonl --out out-dir/ --template 2
+# python bulk_render.py candidates.csv --zip resumes.zip --template all --workers 8
+
+import os
+import re
+import sys
+import csv
+import json
+import time
+import shutil
+import asyncio
+import zipfile
+import argparse
+from concurrent.futures import wait, FIRST_COMPLETED
+
+from pydantic import ValidationError
+
+from templates import TEMPLATES
+from render_pool import RenderPool
+from schemas import ResumeRequest
+from grammar import correct_resume_data, prepare_correction_engines
+from photos import photo_cache, InvalidPhoto
+
+
+
+#   INPUT (rows are streamed, never loaded all at once)
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+def read_rows(path):
+    # -> dict per row, or an InvalidRow in its place so one bad line fails alone
+    handle = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(handle):
+                # empty CSV cells mean "not provided"
+                yield {k: v for k, v in row.items() if k and v not in (None, "")}
+        else:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield InvalidRow(f"invalid JSON: {e}")
+                    continue
+                yield row if isinstance(row, dict) else InvalidRow("row is not a JSON object")
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def template_index(value):
+    # "3" / 3 -> 2; ValueError for anything that isn't a template number
+    try:
+        number = int(str(value).strip())
+    except ValueError:
+        number = 0
+    if not 1 <= number <= len(TEMPLATES):
+        raise ValueError(f"template must be 1-{len(TEMPLATES)}, got {value!r}")
+    return number - 1
+
+
+def expand_jobs(rows, template_arg, correct=False, language=None):
+    # -> (row number, template index, render data) or (row number, None, error)
+    for row_number, row in enumerate(rows, start=1):
+        if isinstance(row, InvalidRow):
+            yield row_number, None, str(row)
+            continue
+
+        if row.get("photo_file"):
+            # a local image file, cached like an upload and referenced by id
+            try:
+                row = dict(row, photo=photo_cache.add_file(row["photo_file"]))
+            except (OSError, InvalidPhoto) as e:
+                yield row_number, None, f"invalid photo: {e}"
+                continue
+
+        try:
+            data = ResumeRequest.parse_obj(row).to_render_data()
+        except ValidationError as e:
+            yield row_number, None, f"invalid row: {e.errors()}"
+            continue
+
+        if correct:
+            # GRAMMAR_ENGINE=symspell keeps this in-process, no JVM needed
+            try:
+                data, _ = asyncio.run(correct_resume_data(data, row.get("language") or language))
+            except ValueError as e:
+                yield row_number, None, str(e)
+                continue
+
+        if "template" not in row and template_arg == "all":
+            indexes = range(len(TEMPLATES))
+        else:
+            # a row's own template wins over --template, "all" included
+            try:
+                indexes = [template_index(row["template"] if "template" in row else template_arg)]
+            except ValueError as e:
+                yield row_number, None, str(e)
+                continue
+
+        for index in indexes:
+            yield row_number, index, data
+
+
+
+#   OUTPUT (directory or streamed ZIP)
+
+
+def output_name(row_number, template_index, data):
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", data.get("full_name", "")).strip("_")[:40] or "resume"
+    return f"{row_number:06d}_{slug}_template_{template_index + 1}.pdf"
+
+
+class DirectoryWriter:
+
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def add(self, name, pdf_path):
+        shutil.move(pdf_path, os.path.join(self.folder, name))
+
+    def close(self):
+        pass
+
+
+class ZipWriter:
+
+    def __init__(self, path):
+        target = sys.stdout.buffer if path == "-" else open(path, "wb")
+        self.target = target
+        # PDFs are already deflated, storing avoids recompressing them
+        self.zip = zipfile.ZipFile(target, "w", compression=zipfile.ZIP_STORED)
+
+    def add(self, name, pdf_path):
+        self.zip.write(pdf_path, arcname=name)
+
+    def close(self):
+        self.zip.close()
+        if self.target is not sys.stdout.buffer:
+            self.target.close()
+
+
+
+#   BULK RUN
+
+
+def report(stats, started, final=False):
+    elapsed = max(time.time() - started, 1e-6)
+    line = (f"rendered={stats['rendered']} failed={stats['failed']} "
+            f"elapsed={elapsed:.1f}s rate={stats['rendered'] / elapsed:.1f}/s")
+    print(("done: " if final else "") + line, file=sys.stderr, flush=True)
+
+
+def run(args):
+    writer = ZipWriter(args.zip) if args.zip else DirectoryWriter(args.out)
+    errors = open(args.errors, "w", encoding="utf-8") if args.errors else None
+
+    if args.correct:
+        prepare_correction_engines()  # spelling indexes, before any row needs one
+
+    pool = RenderPool(workers=args.workers)
+    pool.start()
+
+    stats = {"rendered": 0, "failed": 0}
+    started = time.time()
+    in_flight = {}
+    max_in_flight = args.workers * 4
+
+    def fail(row_number, template_index, message):
+        stats["failed"] += 1
+        if errors:
+            errors.write(json.dumps({
+                "row": row_number,
+                "template": None if template_index is None else template_index + 1,
+                "error": message,
+            }) + "\n")
+
+    def drain(block_until):
+        while len(in_flight) > block_until:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                row_number, template_index, data = in_flight.pop(future)
+                try:
+                    pdf_path = future.result()
+                except Exception as e:
+                    fail(row_number, template_index, str(e))
+                    continue
+                writer.add(output_name(row_number, template_index, data), pdf_path)
+                shutil.rmtree(os.path.dirname(pdf_path), ignore_errors=True)
+                stats["rendered"] += 1
+                if stats["rendered"] % args.progress_every == 0:
+                    report(stats, started)
+
+    try:
+        jobs = expand_jobs(read_rows(args.input), args.template, args.correct, args.language)
+        for row_number, template_index, data in jobs:
+            if template_index is None:
+                fail(row_number, None, data)
+                continue
+            future = pool.submit(template_index, data, timeout=args.timeout)
+            in_flight[future] = (row_number, template_index, data)
+            # bounded memory: never hold more than a few renders per worker
+            drain(max_in_flight - 1)
+        drain(0)
+    finally:
+        pool.shutdown()
+        writer.close()
+        if errors:
+            errors.close()
+
+    report(stats, started, final=True)
+    return 1 if stats["failed"] else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render resumes in bulk from a CSV/JSONL file")
+    parser.add_argument("input", help="CSV or JSONL file of resume payloads ('-' for JSONL on stdin)")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--out", help="write PDFs into this directory")
+    target.add_argument("--zip", help="stream PDFs into this ZIP file ('-' for stdout)")
+    parser.add_argument("--template", default="1",
+                        help="template number 1-7 or 'all' (a row's 'template' column wins)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--timeout", type=float, default=60, help="per-render deadline in seconds")
+    parser.add_argument("--errors", help="write failed rows as JSONL to this file")
+    parser.add_argument("--progress-every", type=int, default=100)
+    parser.add_argument("--correct", action="store_true", help="auto-correct free-text fields first")
+    parser.add_argument("--language", help="language of the rows (default: detected per row)")
+    args = parser.parse_args()
+
+    if args.template != "all":
+        try:
+            template_index(args.template)
+        except ValueError:
+            parser.error(f"--template must be 1-{len(TEMPLATES)} or 'all'")
+
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
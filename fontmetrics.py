@@ -0,0 +1,169 @@
+# fontmetrics.py
+
+import os
+import mmap
+import zlib
+import struct
+import tempfile
+import threading
+from operator import itemgetter
+
+import reportlab
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFontFile
+
+
+
+#   SHARED FONT METRICS
+#
+#   Glyph widths of every font the templates may use are written once into a
+#   flat file that each process maps read-only, so text is measured without
+#   parsing any TTF and every process measures it identically. Widths are
+#   stored exactly as ReportLab holds them (1/1000 em, float64) for all BMP
+#   code points. TrueType fonts also keep the few glyphs they map beyond the
+#   BMP and their default width (what ReportLab uses for unmapped code
+#   points), so emoji and the like never need the font registered.
+#
+#   File layout (little endian):
+#     header   magic, version, font count, fingerprint crc32
+#     fonts    count x (name 64s, kind u32, extra count u32, offset u64,
+#                       extra offset u64, default width f64)
+#     widths   count x 65536 x f64
+#     extra    per font: extra count x (code point u32, width f64)
+
+
+METRICS_MAGIC = b"FMET"
+METRICS_VERSION = 2
+HEADER = struct.Struct("<4sIII")
+FONT_ENTRY = struct.Struct("<64sIIQQd")
+EXTRA_WIDTH = struct.Struct("<Id")
+CODEPOINTS = 0x10000
+KIND_TYPE1, KIND_TTF = 1, 2
+
+FONT_METRICS_PATH = os.getenv(
+    "FONT_METRICS_PATH", os.path.join(tempfile.gettempdir(), "resume-font-metrics.bin")
+)
+
+# fallbacks resolve_font() may pick when a template font is missing
+STANDARD_FONTS = ("Helvetica", "Helvetica-Bold", "Times-Roman", "Times-Bold")
+
+
+def fingerprint(ttf_files):
+    # changes whenever a font file, the font set or ReportLab changes
+    parts = [reportlab.Version]
+    for name, path in sorted(ttf_files.items()):
+        stat = os.stat(path)
+        parts.append(f"{name}={path}:{stat.st_size}:{int(stat.st_mtime)}")
+    return zlib.crc32("|".join(parts).encode())
+
+
+def ttf_widths(path):
+    # -> (BMP widths, {code point beyond the BMP: width}, default width)
+    face = TTFontFile(path)
+    widths = [face.defaultWidth] * CODEPOINTS
+    extra = {}
+    for code, width in face.charWidths.items():
+        if code < CODEPOINTS:
+            widths[code] = width
+        else:
+            extra[code] = width
+    return widths, extra, face.defaultWidth
+
+
+def type1_widths(name):
+    font = pdfmetrics.getFont(name)
+    # Type1 widths are whole units; stringWidth(ch, 1000) only adds float noise
+    return [round(font.stringWidth(chr(code), 1000)) for code in range(CODEPOINTS)], {}, 0
+
+
+def build_font_metrics(path, ttf_files):
+    fonts = []
+    for name, file in sorted(ttf_files.items()):
+        try:
+            fonts.append((name, KIND_TTF, *ttf_widths(file)))
+        except Exception:
+            continue  # unreadable font, templates fall back to a standard one
+    fonts += [(name, KIND_TYPE1, *type1_widths(name)) for name in STANDARD_FONTS if name not in ttf_files]
+
+    offset = HEADER.size + FONT_ENTRY.size * len(fonts)
+    extra_offset = offset + len(fonts) * CODEPOINTS * 8
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(METRICS_MAGIC, METRICS_VERSION, len(fonts), fingerprint(ttf_files)))
+        for i, (name, kind, _, extra, default_width) in enumerate(fonts):
+            f.write(FONT_ENTRY.pack(name.encode(), kind, len(extra), offset + i * CODEPOINTS * 8,
+                                    extra_offset, default_width))
+            extra_offset += len(extra) * EXTRA_WIDTH.size
+        for _, _, widths, _, _ in fonts:
+            f.write(struct.pack(f"<{CODEPOINTS}d", *widths))
+        for _, _, _, extra, _ in fonts:
+            for code, width in sorted(extra.items()):
+                f.write(EXTRA_WIDTH.pack(code, width))
+    os.replace(tmp_path, path)  # readers never see a partial file
+
+
+class FontMetrics:
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, self.fingerprint = HEADER.unpack_from(self.mm)
+        if magic != METRICS_MAGIC or version != METRICS_VERSION:
+            raise ValueError(f"{path} is not a font metrics file")
+
+        view = memoryview(self.mm)
+        self.fonts = {}
+        self.ttf_fonts = set()
+        self.extra = {}  # TTF name -> ({code point beyond the BMP: width}, default width)
+        for i in range(count):
+            name, kind, extra_count, offset, extra_offset, default_width = FONT_ENTRY.unpack_from(
+                self.mm, HEADER.size + i * FONT_ENTRY.size
+            )
+            widths = view[offset:offset + CODEPOINTS * 8].cast("d")
+            name = name.rstrip(b"\0").decode()
+            self.fonts[name] = (kind, widths)
+            if kind == KIND_TTF:
+                self.ttf_fonts.add(name)
+                extra = dict(EXTRA_WIDTH.iter_unpack(self.mm[extra_offset:extra_offset + extra_count * EXTRA_WIDTH.size]))
+                self.extra[name] = (extra, default_width)
+
+    def string_width(self, text, font_name, font_size):
+        entry = self.fonts.get(font_name)
+        if entry is None:
+            return pdfmetrics.stringWidth(text, font_name, font_size)
+        kind, widths = entry
+        if text and max(text) >= "\U00010000":
+            if kind != KIND_TTF:
+                return pdfmetrics.stringWidth(text, font_name, font_size)  # standard fonts are built in
+            extra, default_width = self.extra[font_name]
+            total = sum(widths[code] if code < CODEPOINTS else extra.get(code, default_width)
+                        for code in map(ord, text))
+        elif len(text) > 1:
+            total = sum(itemgetter(*map(ord, text))(widths))
+        else:
+            total = widths[ord(text)] if text else 0
+        # same operation order as ReportLab's rl_accel, so results match bit for bit
+        return total * 0.001 * font_size
+
+
+
+#   PROCESS-WIDE INSTANCE (built by whichever process needs it first)
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def load_font_metrics(ttf_files, path=FONT_METRICS_PATH):
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            try:
+                metrics = FontMetrics(path)
+                if metrics.fingerprint != fingerprint(ttf_files):
+                    raise ValueError("stale font metrics")
+            except (OSError, ValueError):
+                build_font_metrics(path, ttf_files)
+                metrics = FontMetrics(path)
+            _metrics = metrics
+        return _metrics
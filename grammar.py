@@ -0,0 +1,661 @@
+# grammar.py
+
+import os
+import re
+import ssl
+import glob
+import json
+import time
+import asyncio
+import threading
+from urllib.parse import urlencode, urlsplit
+from functools import lru_cache
+from collections import OrderedDict
+
+import metrics
+from spelling import load_index, ensure_index
+
+
+
+#   LANGUAGES
+#
+#   Each LanguageTool instance runs its own Java server, so instances are
+#   created on first use per language and the least recently used ones are
+#   closed once the estimated memory budget is exceeded.
+
+
+DEFAULT_LANGUAGE = os.getenv("GRAMMAR_DEFAULT_LANGUAGE", "en-US")
+GRAMMAR_MEMORY_BUDGET_MB = int(os.getenv("GRAMMAR_MEMORY_BUDGET_MB", "1024"))
+GRAMMAR_INSTANCE_MB = int(os.getenv("GRAMMAR_INSTANCE_MB", "400"))  # rough JVM footprint
+
+SUPPORTED_LANGUAGES = {
+    "en": "en-US",
+    "de": "de-DE",
+    "fr": "fr",
+    "es": "es",
+    "pt": "pt-PT",
+    "it": "it",
+    "nl": "nl",
+}
+
+# free-text fields worth checking; lists, names and contacts are left alone
+CORRECTABLE_FIELDS = ("profile_summary", "work_experience", "education")
+
+# a shared LanguageTool server (e.g. http://grammar:8010/v2/); unset starts
+# a local one per language through the checker pool
+GRAMMAR_SERVER_URL = os.getenv("GRAMMAR_SERVER_URL")
+GRAMMAR_TIMEOUT_SECONDS = float(os.getenv("GRAMMAR_TIMEOUT_SECONDS", "2"))
+GRAMMAR_START_TIMEOUT_SECONDS = float(os.getenv("GRAMMAR_START_TIMEOUT_SECONDS", "60"))
+GRAMMAR_BREAKER_FAILURES = int(os.getenv("GRAMMAR_BREAKER_FAILURES", "5"))
+GRAMMAR_BREAKER_COOLDOWN = float(os.getenv("GRAMMAR_BREAKER_COOLDOWN", "30"))
+GRAMMAR_SENTENCE_CACHE_SIZE = int(os.getenv("GRAMMAR_SENTENCE_CACHE_SIZE", "20000"))
+
+# word lists (one word per line) used by the "probably clean" pre-filter
+WORDLIST_DIR = os.getenv("GRAMMAR_WORDLIST_DIR", "wordlists")
+SYSTEM_WORDLIST = "/usr/share/dict/words"
+
+
+
+#   LANGUAGE DETECTION (stopword vote, good enough to pick a checker)
+
+
+STOPWORDS = {
+    "en": {"the", "and", "of", "to", "in", "with", "for", "on", "is", "as", "at", "my", "i"},
+    "de": {"der", "die", "und", "das", "mit", "für", "ich", "von", "zu", "den", "im", "ist", "als"},
+    "fr": {"le", "la", "les", "et", "des", "de", "du", "pour", "avec", "je", "en", "une", "dans"},
+    "es": {"el", "la", "los", "y", "de", "del", "para", "con", "en", "una", "por", "mi", "las"},
+    "pt": {"o", "a", "os", "e", "de", "do", "da", "para", "com", "em", "uma", "por", "meu"},
+    "it": {"il", "la", "e", "di", "del", "della", "per", "con", "in", "una", "che", "gli", "mi"},
+    "nl": {"de", "het", "en", "van", "een", "met", "voor", "in", "op", "ik", "als", "bij", "te"},
+}
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+
+def detect_language(text, default=DEFAULT_LANGUAGE):
+    words = WORD_PATTERN.findall((text or "").lower())[:400]
+    if not words:
+        return default
+    scores = {lang: sum(word in stopwords for word in words) for lang, stopwords in STOPWORDS.items()}
+    best = max(scores, key=scores.get)
+    if scores[best] < 2:
+        return default
+    return SUPPORTED_LANGUAGES[best]
+
+
+def resolve_language(language, text=""):
+    # explicit code ("de", "de-DE"), "auto" / None -> detected from the text
+    if not language or language == "auto":
+        return detect_language(text)
+    if language in SUPPORTED_LANGUAGES.values():
+        return language
+    base = language.split("-")[0].lower()
+    if base not in SUPPORTED_LANGUAGES:
+        raise ValueError(f"unsupported language: {language}")
+    return SUPPORTED_LANGUAGES[base]
+
+
+
+#   CHECKER POOL (lazy, LRU-evicted under a memory budget)
+
+
+class CheckerPool:
+
+    def __init__(self, budget_mb=GRAMMAR_MEMORY_BUDGET_MB, instance_mb=GRAMMAR_INSTANCE_MB):
+        self.max_instances = max(1, budget_mb // instance_mb)
+        self.checkers = OrderedDict()  # language -> [tool, users, evicted]
+        self.lock = threading.Lock()
+        self.stats = {"created": 0, "evicted": 0}
+
+    def acquire(self, language):
+        with self.lock:
+            entry = self.checkers.get(language)
+            if entry is not None:
+                self.checkers.move_to_end(language)
+                entry[1] += 1
+                return entry
+
+        # starting a JVM takes seconds, do it outside the lock
+        import language_tool_python
+        tool = language_tool_python.LanguageTool(language)
+
+        with self.lock:
+            entry = self.checkers.get(language)
+            if entry is not None:
+                # another thread won the race
+                entry[1] += 1
+                self.checkers.move_to_end(language)
+                spare = tool
+            else:
+                entry = [tool, 1, False]
+                self.checkers[language] = entry
+                self.stats["created"] += 1
+                spare = None
+            evicted = self._evict()
+
+        if spare is not None:
+            spare.close()
+        for tool in evicted:
+            tool.close()
+        return entry
+
+    def release(self, entry):
+        with self.lock:
+            entry[1] -= 1
+            close = entry[2] and entry[1] == 0
+        if close:
+            entry[0].close()
+
+    def _evict(self):
+        # checkers still in use are closed by the last release()
+        closable = []
+        while len(self.checkers) > self.max_instances:
+            _, entry = self.checkers.popitem(last=False)
+            entry[2] = True
+            self.stats["evicted"] += 1
+            if entry[1] == 0:
+                closable.append(entry[0])
+        return closable
+
+
+
+checkers = CheckerPool()
+
+
+
+#   PRE-FILTER
+#
+#   Decides per field whether a LanguageTool call is worth making: contact
+#   details, ids, headers and comma separated lists never are, prose is
+#   skipped when every word is in the word list and the sentences look well
+#   formed. Fields not listed here are never sent.
+
+
+FIELD_KINDS = {
+    "full_name": "name",
+    "job_role": "name",
+    "email": "contact",
+    "phone": "contact",
+    "skills": "list",
+    "languages": "list",
+    "certifications": "list",
+    "interests": "list",
+    "profile_summary": "prose",
+    "work_experience": "prose",
+    "education": "prose",
+    "skills_header": "header",
+    "languages_header": "header",
+    "certifications_header": "header",
+    "profile_summary_header": "header",
+    "work_experience_header": "header",
+    "education_header": "header",
+    "interests_header": "header",
+    "photo": "id",  # photo cache key, any change loses the photo
+}
+
+EMAIL_OR_URL_PATTERN = re.compile(r"\S+@\S+|https?://\S+|www\.\S+")
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:['.\-+#][^\W_]+)*[+#]*")
+SENTENCE_END_PATTERN = re.compile(r"[.!?]\s+")
+REPEATED_WORD_PATTERN = re.compile(r"\b(\w+)\s+\1\b", re.IGNORECASE)
+SPACE_BEFORE_PUNCT_PATTERN = re.compile(r"\s[,.;:!?]|  ")
+
+
+def looks_like_list(text):
+    # "Python, Go, SQL" or one short item per line
+    items = [item for item in re.split(r"[,;\n•|]", text) if item.strip()]
+    return len(items) > 1 and max(len(item.split()) for item in items) <= 4
+
+
+def classify_field(field, text):
+    kind = FIELD_KINDS.get(field, "unknown")
+    if kind == "prose" and looks_like_list(text):
+        return "list"
+    return kind
+
+
+def wordlist_paths():
+    # every word list some language can resolve to
+    paths = sorted(glob.glob(os.path.join(WORDLIST_DIR, "*.txt")))
+    if os.path.exists(SYSTEM_WORDLIST):
+        paths.append(SYSTEM_WORDLIST)
+    return paths
+
+
+def wordlist_path(language):
+    base = language.split("-")[0]
+    paths = [os.path.join(WORDLIST_DIR, f"{base}.txt")]
+    if base == "en":
+        paths.append(SYSTEM_WORDLIST)
+    for path in paths:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+@lru_cache(maxsize=None)
+def load_wordlist(language):
+    path = wordlist_path(language)
+    if path is None:
+        return frozenset()
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        # "word" or "word count" lines
+        return frozenset(line.split()[0].lower() for line in f if line.strip())
+
+
+def is_known_token(token, words, sentence_start=False):
+    # acronyms, versions and mixed-case names (AWS, v2, GitHub) pass, so does a
+    # capitalized name mid-sentence (Kubernetes); a sentence's first word is
+    # capitalized anyway and has to be a known word like any other
+    if any(ch.isdigit() for ch in token) or token.isupper() and len(token) > 1:
+        return True
+    if any(ch.isupper() for ch in token[1:]):
+        return True
+    if token[0].isupper() and not sentence_start:
+        return True
+    lowered = token.lower()
+    return lowered in words or lowered.rstrip("s") in words or lowered.replace("-", "") in words
+
+
+def probably_clean(text, language):
+    words = load_wordlist(language)
+    if not words:
+        return False  # no word list, can't tell
+
+    if REPEATED_WORD_PATTERN.search(text) or SPACE_BEFORE_PUNCT_PATTERN.search(text):
+        return False
+
+    for sentence in SENTENCE_END_PATTERN.split(text.strip()):
+        if sentence and sentence[0].islower():
+            return False
+
+    stripped = EMAIL_OR_URL_PATTERN.sub(" ", text)
+    for line in stripped.splitlines():
+        # every line starts a sentence too (bullets, one item per line)
+        for sentence in SENTENCE_END_PATTERN.split(line):
+            tokens = TOKEN_PATTERN.findall(sentence)
+            if not all(is_known_token(token, words, i == 0) for i, token in enumerate(tokens)):
+                return False
+    return True
+
+
+def needs_check(field, text, language):
+    kind = classify_field(field, text)
+    if kind != "prose":
+        metrics.incr(f"grammar_skipped_{kind}")
+        return False
+    if probably_clean(text, language):
+        metrics.incr("grammar_skipped_clean")
+        return False
+    return True
+
+
+
+#   CIRCUIT BREAKER
+#
+#   After enough consecutive failures the backend is not called at all for a
+#   cool-down period; the first call after it is a trial that closes or
+#   re-opens the breaker.
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+
+    def __init__(self, failures=GRAMMAR_BREAKER_FAILURES, cooldown=GRAMMAR_BREAKER_COOLDOWN):
+        self.max_failures = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self.trial:
+                self.trial = True  # one trial call at a time
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial or self.failures >= self.max_failures:
+                if self.opened_at is None or self.trial:
+                    metrics.incr("grammar_breaker_trips")
+                self.opened_at = time.monotonic()
+                self.trial = False
+
+
+breaker = CircuitBreaker()
+
+
+
+#   ASYNC LANGUAGETOOL CLIENT (speaks the /v2/check HTTP API directly)
+
+
+def apply_matches(text, matches):
+    # first suggested replacement of every match, applied back to front
+    for match in sorted(matches, key=lambda m: m["offset"], reverse=True):
+        replacements = match.get("replacements")
+        if replacements:
+            start = match["offset"]
+            text = text[:start] + replacements[0]["value"] + text[start + match["length"]:]
+    return text
+
+
+def decode_chunked(body):
+    out = b""
+    while body:
+        size_line, _, body = body.partition(b"\r\n")
+        size = int(size_line.split(b";")[0], 16)
+        if size == 0:
+            break
+        out += body[:size]
+        body = body[size + 2:]
+    return out
+
+
+async def http_post_form(url, fields):
+    parts = urlsplit(url)
+    secure = parts.scheme == "https"
+    port = parts.port or (443 if secure else 80)
+    body = urlencode(fields).encode()
+
+    reader, writer = await asyncio.open_connection(
+        parts.hostname, port, ssl=ssl.create_default_context() if secure else None
+    )
+    try:
+        writer.write(
+            f"POST {parts.path or '/'} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            "Content-Type: application/x-www-form-urlencoded\r\n"
+            "Accept: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+
+    head, _, payload = response.partition(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    status = int(status_line.split()[1])
+    headers = {k.strip().lower(): v.strip() for k, _, v in (h.partition(":") for h in header_lines)}
+    if headers.get("transfer-encoding") == "chunked":
+        payload = decode_chunked(payload)
+    if status != 200:
+        raise RuntimeError(f"LanguageTool returned HTTP {status}")
+    return json.loads(payload)
+
+
+class AsyncGrammarClient:
+
+    def __init__(self, server_url=GRAMMAR_SERVER_URL, timeout=GRAMMAR_TIMEOUT_SECONDS,
+                 start_timeout=GRAMMAR_START_TIMEOUT_SECONDS, breaker=breaker):
+        self.server_url = server_url
+        self.timeout = timeout
+        self.start_timeout = start_timeout
+        self.breaker = breaker
+
+    async def check(self, language, text):
+        # -> list of match dicts; raises CircuitOpen, TimeoutError or the backend error
+        if not self.breaker.allow():
+            raise CircuitOpen("grammar backend unavailable")
+        entry = None
+        try:
+            url = self.server_url
+            if url is None:
+                # local JVM per language, started (once) off the event loop
+                acquiring = asyncio.ensure_future(asyncio.to_thread(checkers.acquire, language))
+                try:
+                    entry = await asyncio.wait_for(asyncio.shield(acquiring), self.start_timeout)
+                except BaseException:
+                    # timed out or cancelled: the thread still acquires, hand it back once it has
+                    acquiring.add_done_callback(release_acquired)
+                    raise
+                url = entry[0]._url
+            result = await asyncio.wait_for(
+                http_post_form(url.rstrip("/") + "/check", {"language": language, "text": text}),
+                self.timeout,
+            )
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        finally:
+            if entry is not None:
+                checkers.release(entry)
+        self.breaker.record_success()
+        return result.get("matches", [])
+
+
+def release_acquired(future):
+    # done callback for an acquire nobody waits for any more
+    if not future.cancelled() and future.exception() is None:
+        checkers.release(future.result())
+
+
+grammar_client = AsyncGrammarClient()
+
+
+
+#   CORRECTION ENGINES
+#
+#   GRAMMAR_ENGINE picks the engine per deployment; GRAMMAR_FALLBACK_ENGINE
+#   (optional) is used whenever the primary one fails or is switched off by
+#   its circuit breaker.
+
+
+GRAMMAR_ENGINE = os.getenv("GRAMMAR_ENGINE", "languagetool")
+GRAMMAR_FALLBACK_ENGINE = os.getenv("GRAMMAR_FALLBACK_ENGINE", "")
+
+
+class LanguageToolEngine:
+
+    name = "languagetool"
+
+    def prepare(self):
+        pass  # JVMs start per language on first use
+
+    async def correct(self, text, language):
+        return apply_matches(text, await grammar_client.check(language, text))
+
+
+class SymSpellEngine:
+    # spelling only (no grammar), from the word list through a shared index
+
+    name = "symspell"
+
+    def prepare(self):
+        # indexes are built here (startup, bulk runs), never inside a request
+        for path in wordlist_paths():
+            ensure_index(path)
+
+    async def correct(self, text, language):
+        return await asyncio.to_thread(self.correct_words, text, language)
+
+    def correct_words(self, text, language):
+        path = wordlist_path(language)
+        if path is None:
+            raise LookupError(f"no word list for {language}")
+        index = load_index(path)  # LookupError until prepare() built it
+
+        def fix(m):
+            token = m.group(0)
+            # names, acronyms, short words and things like node.js stay as typed
+            if len(token) < 3 or not token.isalpha() or not token.islower():
+                return token
+            if index.contains(token):
+                return token
+            return index.suggest(token) or token
+
+        return TOKEN_PATTERN.sub(fix, text)
+
+
+CORRECTION_ENGINES = {
+    "languagetool": LanguageToolEngine,
+    "symspell": SymSpellEngine,
+}
+
+correction_engine = CORRECTION_ENGINES[GRAMMAR_ENGINE]()
+fallback_engine = CORRECTION_ENGINES[GRAMMAR_FALLBACK_ENGINE]() if GRAMMAR_FALLBACK_ENGINE else None
+
+
+def prepare_correction_engines():
+    for engine in (correction_engine, fallback_engine):
+        if engine is not None:
+            engine.prepare()
+
+
+
+#   AUTO-CORRECTION
+
+
+ABBREVIATIONS = {"e.g.", "i.e.", "etc.", "vs.", "approx.", "incl.", "dept.", "no.", "mr.", "ms.", "dr."}
+SENTENCE_START_PATTERN = re.compile(r"(?<!\S)(\S*[.!?])(\s+)(?=[a-z])")
+
+
+def capitalize_sentences(text):
+    # only after sentence-ending punctuation + whitespace, so "e.g. a" and
+    # "node.js" are left alone
+    chars = list(text)
+    for m in SENTENCE_START_PATTERN.finditer(text):
+        if m.group(1).lower() not in ABBREVIATIONS:
+            chars[m.end()] = chars[m.end()].upper()
+    return "".join(chars)
+
+
+#   SENTENCE CACHE
+#
+#   Text is corrected sentence by sentence and every corrected sentence is
+#   cached, so re-checking a long field after a small edit only sends the
+#   sentences that changed. Misses go to the engine in one batch.
+
+
+SENTENCE_SPLIT_PATTERN = re.compile(r"((?<=[.!?])[ \t]+|\s*\n\s*)")
+BATCH_SEPARATOR = "\n\n"
+
+
+def split_sentences(text):
+    # -> (sentences, separators) with len(separators) == len(sentences) - 1
+    parts = SENTENCE_SPLIT_PATTERN.split(text)
+    sentences, separators = [parts[0]], []
+    for separator, sentence in zip(parts[1::2], parts[2::2]):
+        last_word = sentences[-1].rsplit(None, 1)[-1].lower() if sentences[-1].strip() else ""
+        if last_word in ABBREVIATIONS and "\n" not in separator:
+            sentences[-1] += separator + sentence  # "e.g. foo" is one sentence
+        else:
+            separators.append(separator)
+            sentences.append(sentence)
+    return sentences, separators
+
+
+class SentenceCache:
+
+    def __init__(self, max_entries=GRAMMAR_SENTENCE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+sentence_cache = SentenceCache()
+
+
+async def correct_sentences(engine, text, language):
+    sentences, separators = split_sentences(text)
+    corrected = [
+        sentence_cache.get((engine.name, language, sentence)) if sentence.strip() else sentence
+        for sentence in sentences
+    ]
+    misses = [i for i, value in enumerate(corrected) if value is None]
+    metrics.incr("grammar_sentence_cache_hits", len(sentences) - len(misses))
+    metrics.incr("grammar_sentence_cache_misses", len(misses))
+
+    if misses:
+        batch = await engine.correct(BATCH_SEPARATOR.join(sentences[i] for i in misses), language)
+        results = batch.split(BATCH_SEPARATOR)
+        if len(results) != len(misses):
+            # the engine merged or split sentences, correct the text whole, uncached
+            return await engine.correct(text, language)
+        for i, result in zip(misses, results):
+            corrected[i] = result
+            sentence_cache.put((engine.name, language, sentences[i]), result)
+
+    out = [corrected[0]]
+    for separator, sentence in zip(separators, corrected[1:]):
+        out += [separator, sentence]
+    return "".join(out)
+
+
+async def auto_correct_text(text: str, language=DEFAULT_LANGUAGE, skip_fields=()):
+    # primary engine, then the fallback engine, then the uncorrected text
+    if not text:
+        return text
+    if text in skip_fields:
+        return text
+    metrics.incr("grammar_checks")
+    for engine in (correction_engine, fallback_engine):
+        if engine is None:
+            continue
+        try:
+            corrected = await correct_sentences(engine, text, language)
+        except CircuitOpen:
+            metrics.incr(f"grammar_fallback_{engine.name}_breaker_open")
+        except asyncio.TimeoutError:
+            metrics.incr(f"grammar_fallback_{engine.name}_timeout")
+        except Exception:
+            metrics.incr(f"grammar_fallback_{engine.name}_error")
+        else:
+            metrics.incr(f"grammar_corrected_{engine.name}")
+            return capitalize_sentences(corrected)
+        finally:
+            metrics.set_gauge("grammar_breaker", breaker.state)
+    return text
+
+
+async def correct_resume_data(data, language=None):
+    # -> (corrected copy of data, language used); language None/"auto" detects
+    sample = " ".join(data.get(field, "") for field in CORRECTABLE_FIELDS)
+    language = resolve_language(language, sample)
+    fields = [
+        field for field, text in data.items()
+        if not field.endswith("_header") and isinstance(text, str) and text
+        and needs_check(field, text, language)
+    ]
+    results = await asyncio.gather(*(auto_correct_text(data[field], language) for field in fields))
+    corrected = dict(data)
+    corrected.update(zip(fields, results))
+    return corrected, language
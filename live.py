@@ -0,0 +1,238 @@
+# live.py
+
+import os
+import json
+import time
+import shutil
+import asyncio
+
+from pydantic import ValidationError
+from starlette.websockets import WebSocketDisconnect
+
+from templates import TEMPLATES, TEMPLATE_PLANS, measure_plan, fit_plan, render_budget, RenderTimeout, RenderCancelled
+from render_pool import RenderError
+from schemas import ResumeRequest, MAX_BODY_BYTES
+from admission import admission
+import metrics
+
+
+
+#   LIVE PREVIEW SESSIONS (one per WebSocket)
+#
+#   The editor sends edits, the session keeps the merged payload and renders
+#   it once edits pause (LIVE_DEBOUNCE_MS), at least every LIVE_MAX_WAIT_MS
+#   while typing goes on, and never more often than LIVE_MIN_INTERVAL_MS.
+#   Starting a render drops the one still in flight, whose result would be
+#   older anyway, so a connection has at most one render running. Every
+#   render is admitted like an HTTP one (client bucket + global cap); while
+#   it is refused, edits keep coalescing into the render that follows.
+#   The merged payload is held to MAX_BODY_BYTES, like a POST body.
+#
+#   client -> {"data": {field: value or null to clear}, "replace": false,
+#              "template": 1, "mode": "layout" | "pdf", "fit_pages": null}
+#   server -> {"type": "layout", "version": n, ...measure_plan}
+#             {"type": "pdf", "version": n, "bytes": size} + one binary frame
+#             {"type": "error", "version": n, "detail": ...}
+#             {"type": "busy", "version": n, "detail": ..., "retry_after": s}
+
+
+LIVE_DEBOUNCE_MS = float(os.getenv("LIVE_DEBOUNCE_MS", "250"))
+LIVE_MAX_WAIT_MS = float(os.getenv("LIVE_MAX_WAIT_MS", "1500"))
+LIVE_MIN_INTERVAL_MS = float(os.getenv("LIVE_MIN_INTERVAL_MS", "500"))
+
+LIVE_MODES = ("layout", "pdf")
+LIVE_MAX_FIT_PAGES = 5
+LIVE_FIELDS = frozenset(ResumeRequest.__fields__)
+
+
+class LiveSession:
+
+    def __init__(self, websocket, pool, timeout, admission=admission):
+        self.websocket = websocket
+        self.pool = pool
+        self.timeout = timeout
+        self.admission = admission
+        self.fields = {}
+        self.options = {"template": 1, "mode": "layout", "fit_pages": None}
+
+        self.version = 0          # bumped by every edit
+        self.current = None       # version of the render running, if any
+        self.first_edit = None    # oldest edit not rendered yet (monotonic)
+        self.last_edit = 0.0
+        self.last_render = 0.0
+        self.changed = asyncio.Event()
+        self.task = None
+        self.measuring = {}       # render task -> its layout thread, while one runs
+        self.send_lock = asyncio.Lock()  # a pdf header and its bytes go out together
+
+    async def run(self):
+        await self.websocket.accept()
+        metrics.incr("live_sessions")
+        scheduler = asyncio.create_task(self.schedule())
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                await self.apply(message.get("text"))
+        except WebSocketDisconnect:
+            pass
+        finally:
+            scheduler.cancel()
+            if self.task is not None:
+                self.current = None
+                self.task.cancel()
+
+    async def apply(self, text):
+        if text is None or len(text) > MAX_BODY_BYTES:
+            await self.send({"type": "error", "version": self.version,
+                             "detail": f"Edits are JSON text of at most {MAX_BODY_BYTES} bytes"})
+            return
+        try:
+            edit = json.loads(text)
+            if not isinstance(edit, dict) or not isinstance(edit.get("data", {}), dict):
+                raise ValueError
+        except ValueError:
+            await self.send({"type": "error", "version": self.version, "detail": "Invalid edit"})
+            return
+
+        fields = {} if edit.get("replace") else dict(self.fields)
+        for key, value in edit.get("data", {}).items():
+            if key not in LIVE_FIELDS:
+                continue  # would be dropped by validation anyway, don't keep it
+            if value is None:
+                fields.pop(key, None)
+            else:
+                fields[key] = value
+        if len(json.dumps(fields)) > MAX_BODY_BYTES:
+            await self.send({"type": "error", "version": self.version,
+                             "detail": f"Payload would exceed {MAX_BODY_BYTES} bytes, edit ignored"})
+            return
+        self.fields = fields
+        for option in self.options:
+            if option in edit:
+                self.options[option] = edit[option]
+
+        self.version += 1
+        self.last_edit = time.monotonic()
+        if self.first_edit is None:
+            self.first_edit = self.last_edit
+        metrics.incr("live_edits")
+        self.changed.set()
+
+    async def schedule(self):
+        while True:
+            await self.changed.wait()
+            while True:
+                due = min(self.last_edit + LIVE_DEBOUNCE_MS / 1000, self.first_edit + LIVE_MAX_WAIT_MS / 1000)
+                due = max(due, self.last_render + LIVE_MIN_INTERVAL_MS / 1000)
+                wait = due - time.monotonic()
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+
+            if self.task is not None and not self.task.done():
+                self.current = None  # stops a layout pass at its next check
+                self.task.cancel()
+                metrics.incr("live_superseded")
+            reason, retry_after = self.admission.admit(self.websocket.scope)
+            if reason:
+                # stays pending, later edits join the render once admitted
+                await self.send({"type": "busy", "version": self.version,
+                                 "detail": reason, "retry_after": round(retry_after, 2)})
+                await asyncio.sleep(retry_after)
+                continue
+
+            # everything edited up to here is covered by this one render
+            self.changed.clear()
+            self.first_edit = None
+            self.last_render = time.monotonic()
+            self.current = self.version
+            self.task = asyncio.create_task(self.render(self.version, dict(self.fields), dict(self.options)))
+            # a done callback also runs for a task cancelled before its first step
+            self.task.add_done_callback(self.rendered)
+
+    def rendered(self, task):
+        # a cancelled layout pass keeps running in its thread until its next
+        # check, the admission slot is held until that thread is done too
+        measuring = self.measuring.pop(task, None)
+        if measuring is not None and not measuring.done():
+            measuring.add_done_callback(self.measured)
+        else:
+            self.admission.release()
+
+    def measured(self, measuring):
+        if not measuring.cancelled():
+            measuring.exception()  # superseded, nobody wants the result
+        self.admission.release()
+
+    async def render(self, version, fields, options):
+        try:
+            template, mode, fit_pages = options["template"], options["mode"], options["fit_pages"]
+            if not isinstance(template, int) or not 1 <= template <= len(TEMPLATES):
+                raise ValueError(f"template must be 1-{len(TEMPLATES)}")
+            if mode not in LIVE_MODES:
+                raise ValueError(f"mode must be one of {', '.join(LIVE_MODES)}")
+            if fit_pages is not None and (not isinstance(fit_pages, int) or not 1 <= fit_pages <= LIVE_MAX_FIT_PAGES):
+                raise ValueError(f"fit_pages must be 1-{LIVE_MAX_FIT_PAGES}")
+            data = ResumeRequest.parse_obj(fields).to_render_data()
+        except ValidationError as e:
+            await self.send({"type": "error", "version": version, "detail": e.errors()})
+            return
+        except ValueError as e:
+            await self.send({"type": "error", "version": version, "detail": str(e)})
+            return
+
+        started = time.perf_counter()
+        try:
+            if mode == "layout":
+                measuring = asyncio.ensure_future(
+                    asyncio.to_thread(self.measure, template - 1, data, fit_pages, version)
+                )
+                self.measuring[asyncio.current_task()] = measuring
+                layout = await asyncio.shield(measuring)
+                render_ms = (time.perf_counter() - started) * 1000
+                await self.send({"type": "layout", "version": version, "template": template,
+                                 "render_ms": round(render_ms, 1), **layout})
+            else:
+                pdf_path = await self.pool.render(template - 1, data, timeout=self.timeout, fit_pages=fit_pages)
+                try:
+                    pdf = await asyncio.to_thread(read_bytes, pdf_path)
+                finally:
+                    shutil.rmtree(os.path.dirname(pdf_path), ignore_errors=True)
+                render_ms = (time.perf_counter() - started) * 1000
+                header = {"type": "pdf", "version": version, "template": template,
+                          "render_ms": round(render_ms, 1), "bytes": len(pdf)}
+                # finished is finished: a newer render starting now must not cut the pair in half
+                await asyncio.shield(self.send(header, pdf))
+            metrics.incr(f"live_renders_{mode}")
+        except RenderCancelled:
+            pass  # superseded while measuring
+        except RenderTimeout:
+            await self.send({"type": "error", "version": version, "detail": "Render timed out"})
+        except RenderError as e:
+            await self.send({"type": "error", "version": version, "detail": str(e)})
+        except Exception as e:
+            metrics.incr("live_errors")
+            await self.send({"type": "error", "version": version, "detail": str(e)})
+
+    def measure(self, template_index, data, fit_pages, version):
+        with render_budget(timeout=self.timeout, cancelled=lambda: self.current != version):
+            plan = TEMPLATE_PLANS[template_index]
+            if fit_pages:
+                plan, _ = fit_plan(template_index, data, fit_pages)
+            return measure_plan(plan, data)
+
+    async def send(self, message, payload=None):
+        async with self.send_lock:
+            try:
+                await self.websocket.send_text(json.dumps(message))
+                if payload is not None:
+                    await self.websocket.send_bytes(payload)
+            except (WebSocketDisconnect, RuntimeError):
+                pass  # closed while rendering, run() is already winding down
+
+
+def read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
@@ -0,0 +1,248 @@
+# loadtest.py
+#
+# python loadtest.py --start --concurrency 16 --duration 30
+# python loadtest.py --url http://127.0.0.1:8000 --templates 1:3,6:1 --payloads small:1,large:1
+# python loadtest.py --url http://127.0.0.1:8000 --api-keys key1,key2  (keys in the server's API_KEYS)
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlsplit
+from collections import defaultdict
+
+from metrics import percentile
+
+
+
+#   PAYLOAD MIX
+
+
+def make_payload(size, rng):
+    paragraphs = {"small": 1, "medium": 4, "large": 12}[size]
+    sentence = "Built and operated services handling millions of requests per day. "
+    return {
+        "full_name": f"Load Test {rng.randint(1, 10 ** 6)}",
+        "job_role": "Software Engineer",
+        "email": "load.test@example.com",
+        "phone": "+1 555 123 4567",
+        "skills": "Python, Go, SQL, Kubernetes, Terraform, AWS",
+        "languages": "English, Spanish",
+        "certifications": "AWS Solutions Architect",
+        "profile_summary": sentence * 3,
+        "work_experience": "\n".join(sentence * 8 for _ in range(paragraphs)),
+        "education": "BSc Computer Science",
+        "interests": "Running, reading",
+    }
+
+
+def parse_weights(spec, cast=str):
+    # "1:3,6:1" -> [(1, 3), (6, 1)]
+    weights = []
+    for part in spec.split(","):
+        key, _, weight = part.partition(":")
+        weights.append((cast(key), float(weight or 1)))
+    return weights
+
+
+def pick(weights, rng):
+    keys = [key for key, _ in weights]
+    return rng.choices(keys, weights=[w for _, w in weights])[0]
+
+
+
+#   LOCAL APP
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(port, api_keys=(), timeout=120):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        # measure capacity, not the rate limiter: one bucket per simulated client, none of them binding
+        env=dict(os.environ, API_KEYS=",".join(api_keys), RATE_LIMIT_RPS="1000000", RATE_LIMIT_BURST="1000000",
+                 LIGHT_RATE_LIMIT_RPS="1000000", LIGHT_RATE_LIMIT_BURST="1000000", MAX_CONCURRENT_RENDERS="1000000"),
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/metrics")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("app did not start")
+
+
+def get_json(base, path):
+    parts = urlsplit(base)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    conn.request("GET", path)
+    return json.loads(conn.getresponse().read())
+
+
+def reset_metrics(base, api_key=None):
+    parts = urlsplit(base)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    conn.request("POST", "/metrics/reset", headers={"X-API-Key": api_key} if api_key else {})
+    response = conn.getresponse()
+    response.read()
+    if response.status != 200:
+        print(f"warning: metrics not reset ({response.status}), server counters include earlier traffic",
+              file=sys.stderr)
+
+
+
+#   LOAD WORKERS
+
+
+class Results:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, kind, status, seconds):
+        with self.lock:
+            self.latencies[kind].append(seconds * 1000)
+            self.statuses[kind][status] += 1
+
+
+def worker(base, args, stop_at, results, seed, budget, api_key):
+    rng = random.Random(seed)
+    parts = urlsplit(base)
+    templates = parse_weights(args.templates, int)
+    payloads = parse_weights(args.payloads)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=args.timeout)
+
+    def request(kind, method, path, body=None):
+        nonlocal conn
+        # a known key per simulated client gets it its own rate limit bucket,
+        # without one every thread shares the bucket of this machine's IP
+        headers = {"X-API-Key": api_key} if api_key else {}
+        if body:
+            headers["Content-Type"] = "application/json"
+        started = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=args.timeout)
+            data, status = b"", "conn_error"
+        results.record(kind, status, time.perf_counter() - started)
+        return status, data
+
+    while time.time() < stop_at and budget.take():
+        template = pick(templates, rng)
+        body = json.dumps(make_payload(pick(payloads, rng), rng))
+        status, data = request("resume", "POST", f"/resume?template={template}", body)
+
+        if status == 200 and rng.random() < args.download_ratio:
+            link = json.loads(data).get("download_link", "")
+            if link:
+                request("files", "GET", urlsplit(link).path)
+
+
+class RequestBudget:
+
+    def __init__(self, total):
+        self.remaining = total
+        self.lock = threading.Lock()
+
+    def take(self):
+        if self.remaining is None:
+            return True
+        with self.lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+
+#   REPORT
+
+
+def print_report(results, elapsed, server_metrics):
+    print(f"{'kind':<8}{'reqs':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}")
+    for kind, latencies in results.latencies.items():
+        statuses = results.statuses[kind]
+        errors = sum(n for status, n in statuses.items() if status != 200)
+        print(f"{kind:<8}{len(latencies):>8}{len(latencies) / elapsed:>9.1f}"
+              f"{percentile(latencies, 50):>10.1f}{percentile(latencies, 95):>10.1f}"
+              f"{percentile(latencies, 99):>10.1f}{errors / len(latencies):>9.1%}")
+        print(f"{'':<8}statuses: {dict(statuses)}")
+
+    lag = server_metrics.get("event_loop_lag", {})
+    print(f"event loop lag: p50={lag.get('p50_ms')}ms p99={lag.get('p99_ms')}ms max={lag.get('max_ms')}ms")
+    print(f"render pool: {server_metrics.get('render_pool')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test POST /resume and /files downloads")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--start", action="store_true", help="start the app locally on a free port")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--requests", type=int, help="stop after this many /resume calls")
+    parser.add_argument("--templates", default="1,2,3,4,5,6,7", help="weights, e.g. 1:3,6:1")
+    parser.add_argument("--payloads", default="small:2,medium:2,large:1", help="weights of small/medium/large")
+    parser.add_argument("--download-ratio", type=float, default=1.0, help="share of renders also downloaded")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--api-keys", default="", help="comma separated keys from the server's API_KEYS, "
+                        "spread over the threads (--start configures its own)")
+    args = parser.parse_args()
+
+    proc = None
+    base = args.url
+    api_keys = [key for key in args.api_keys.split(",") if key]
+    if args.start:
+        api_keys = [f"loadtest-{args.seed + i}" for i in range(args.concurrency)]
+        port = free_port()
+        proc = start_app(port, api_keys)
+        base = f"http://127.0.0.1:{port}"
+
+    try:
+        reset_metrics(base, api_keys[0] if api_keys else None)
+
+        results = Results()
+        budget = RequestBudget(args.requests)
+        stop_at = time.time() + args.duration
+        threads = [
+            threading.Thread(target=worker, args=(base, args, stop_at, results, args.seed + i, budget,
+                                                  api_keys[i % len(api_keys)] if api_keys else None))
+            for i in range(args.concurrency)
+        ]
+        started = time.time()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.time() - started
+
+        print_report(results, elapsed, get_json(base, "/metrics"))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
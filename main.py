@@ -82,31 +82,44 @@ import inspect
 import os
 import shutil
 import time
+import base64
 import asyncio
-from fastapi import FastAPI, HTTPException
+import tempfile
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.requests import ClientDisconnect
 
-from templates import TEMPLATES
+from templates import (
+    TEMPLATES, TEMPLATE_PLANS, measure_plan,
+    render_budget, RenderTimeout, RenderCancelled,
+)
+from render_pool import RenderPool
+from schemas import ResumeRequest, BodySizeLimitMiddleware
+from photos import photo_cache, InvalidPhoto, MAX_PHOTO_BYTES
+from live import LiveSession
+from previews import render_previews, preview_cache
+from admission import AdmissionControlMiddleware, API_KEYS
+from grammar import correct_resume_data, prepare_correction_engines
+from slowlog import slow_renders, anonymize_payload
+from pdfstore import PdfStore
+import metrics
 
 
 PDF_FOLDER = "resume-pdfs"
 os.makedirs(PDF_FOLDER, exist_ok=True)
 
+# identical PDFs are stored once, download names are hard links to them;
+# over PDF_STORE_QUOTA_MB the least recently downloaded ones are evicted
+pdf_store = PdfStore(PDF_FOLDER)
 
+# pre-warmed render worker processes (fonts/templates loaded once per worker)
+render_pool = RenderPool()
 
-#  UNIQUE FILE NAME GENERATOR
-
-def get_unique_filename(base_name, folder):
-    name, ext = os.path.splitext(base_name)
-    counter = 1
-    final_name = base_name
-
-    while os.path.exists(os.path.join(folder, final_name)):
-        final_name = f"{name}({counter}){ext}"
-        counter += 1
-
-    return final_name
+# per-request render budget, enforced inside the draw loops
+RENDER_TIMEOUT_SECONDS = float(os.getenv("RENDER_TIMEOUT_SECONDS", "20"))
 
 
 
@@ -128,11 +141,103 @@ def cleanup_old_pdfs(folder, max_age_hours):
 
 
 
+#  STREAMED PDF (a pool worker saves into a FIFO, the response reads from it)
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+async def stream_pdf(template_index, data, fit_pages=None):
+    started = time.perf_counter()
+    folder = tempfile.mkdtemp()
+    fifo = os.path.join(folder, "resume.pdf")
+    os.mkfifo(fifo)
+    read_fd = os.open(fifo, os.O_RDONLY | os.O_NONBLOCK)
+    # our own write end stays open until the job has ended, so EOF means the
+    # outcome is known (and never comes before the worker has even started)
+    hold_fd = os.open(fifo, os.O_WRONLY)
+    os.set_blocking(read_fd, True)
+    reader = os.fdopen(read_fd, "rb")
+    try:
+        future = render_pool.submit(
+            template_index, data, timeout=RENDER_TIMEOUT_SECONDS, fit_pages=fit_pages, stream_to=fifo,
+        )
+    except Exception:
+        os.close(hold_fd)
+        reader.close()
+        shutil.rmtree(folder, ignore_errors=True)
+        raise
+    future.add_done_callback(lambda _: os.close(hold_fd))
+
+    def finished():
+        # blocking, runs off the event loop once the job has ended
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if slow_renders.is_slow(elapsed_ms):
+            error = future.exception()
+            stages = {name: ms for name, ms in future.timings.items() if name.endswith("_ms")}
+            stages["stream_ms"] = elapsed_ms
+            options = {"stream": True, "fit_pages": fit_pages,
+                       "outcome": type(error).__name__ if error else "ok"}
+            capture_slow_render(template_index + 1, data, elapsed_ms, stages, options)
+
+    first_chunk = await asyncio.to_thread(reader.read, STREAM_CHUNK_SIZE)
+    if not first_chunk:
+        reader.close()
+        shutil.rmtree(folder, ignore_errors=True)
+        asyncio.get_running_loop().run_in_executor(None, finished)
+        raise future.exception() or RuntimeError("Empty PDF output")
+
+    def chunks():
+        try:
+            yield first_chunk
+            while True:
+                chunk = reader.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            reader.close()
+            if not future.done():
+                render_pool.cancel(future.job_id)  # client went away mid-stream
+            shutil.rmtree(folder, ignore_errors=True)
+            finished()
+
+    return chunks()
+
+
+
+#  SLOW RENDER CAPTURE (reproduction bundles, see slowlog.py)
+
+def capture_slow_render(template_number, data, elapsed_ms, stages, options):
+    # blocking, runs off the event loop
+    bundle_id = slow_renders.capture(template_number, data, elapsed_ms, stages, options)
+    metrics.incr("slow_renders_captured")
+    if not slow_renders.claim_profile():
+        return
+
+    # profile a replay of the shaped payload on a worker, the original text
+    # is never stored; the replay gets twice the budget so it can finish
+    future = render_pool.submit(
+        template_number - 1, anonymize_payload(data),
+        timeout=RENDER_TIMEOUT_SECONDS * 2, fit_pages=options.get("fit_pages"), profile=True,
+    )
+    try:
+        pdf_path = future.result()
+    except Exception as e:
+        slow_renders.attach_profile(bundle_id, f"replay failed: {type(e).__name__}: {e}", 0)
+        return
+    shutil.rmtree(os.path.dirname(pdf_path), ignore_errors=True)
+    slow_renders.attach_profile(bundle_id, future.timings.get("profile"), future.timings.get("render_ms", 0))
+
+
+
 #  BACKGROUND TASK (Deletes files every 60 seconds)
 
 async def auto_cleanup_task():
     while True:
         cleanup_old_pdfs(PDF_FOLDER, max_age_hours=24)  # 2 min- (2/60)
+        await asyncio.to_thread(pdf_store.collect)  # contents whose last download name just expired
+        await asyncio.to_thread(pdf_store.enforce_quota)  # full rescan, all workers' files
+        await asyncio.to_thread(photo_cache.collect)
         await asyncio.sleep(60)   # run every minute
 
 
@@ -141,12 +246,24 @@ async def auto_cleanup_task():
 
 async def lifespan(app: FastAPI):
     asyncio.create_task(auto_cleanup_task())  # start background cleaner
+    asyncio.create_task(metrics.monitor_event_loop_lag())
+    await asyncio.to_thread(render_pool.start)  # spawn + warm render workers
+    # spelling indexes build in the background; corrections fall back until then
+    asyncio.create_task(asyncio.to_thread(prepare_correction_engines))
     yield
+    await asyncio.to_thread(render_pool.shutdown)
 
 
 app = FastAPI(lifespan=lifespan)
 
-# Allow all origins for frontend
+# Reject oversized bodies before they are read or parsed
+app.add_middleware(BodySizeLimitMiddleware, path_limits={"/resume/photo": MAX_PHOTO_BYTES})
+
+# Per-client rate limits + global render cap, 429 before anything is parsed
+app.add_middleware(AdmissionControlMiddleware)
+
+# Allow all origins for frontend; added last so it is outermost and the
+# 413/429 answers above carry CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -155,8 +272,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Serve static files
-app.mount("/files", StaticFiles(directory=PDF_FOLDER), name="files")
+# Serve static files, every download counts as an access for quota eviction
+class TrackedStaticFiles(StaticFiles):
+
+    async def get_response(self, path, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 206, 304):
+            pdf_store.touch(path)
+        return response
+
+
+app.mount("/files", TrackedStaticFiles(directory=PDF_FOLDER), name="files")
 
 
 current_template_index = 0
@@ -166,24 +292,74 @@ current_template_index = 0
 #  RESUME ENDPOINT
 
 @app.post("/resume")
-async def unified_resume(data: dict):
+async def unified_resume(
+    payload: ResumeRequest,
+    request: Request,
+    stream: bool = False,
+    template: Optional[int] = Query(None, ge=1, le=len(TEMPLATES)),
+    fit_pages: Optional[int] = Query(None, ge=1, le=5),
+    correct: bool = False,
+    language: Optional[str] = Query(None, max_length=10),
+):
     global current_template_index
 
-    if current_template_index >= len(TEMPLATES):
-        return {"message": "All templates finished", "last_template": True}
+    started = time.perf_counter()
+    stages = {}
+    outcome = "ok"
 
-    selected_template = TEMPLATES[current_template_index]
-    template_number = current_template_index + 1
-    current_template_index += 1
+    # payload is already validated (422 on bad fields) before we get here
+    data = payload.to_render_data()
 
-    try:
-        pdf_path = selected_template(data)
+    if correct:
+        # opt-in: grammar checking starts a LanguageTool server per language
+        try:
+            data, language = await correct_resume_data(data, language)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        metrics.incr(f"corrections_{language}")
+        stages["correct_ms"] = (time.perf_counter() - started) * 1000
 
-        base_pdf_name = f"template_{template_number}.pdf"
-        final_pdf_name = get_unique_filename(base_pdf_name, PDF_FOLDER)
-        final_pdf_path = os.path.join(PDF_FOLDER, final_pdf_name)
+    if template is not None:
+        # explicit choice, leaves the rotation untouched
+        template_number = template
+    else:
+        if current_template_index >= len(TEMPLATES):
+            return {"message": "All templates finished", "last_template": True}
 
-        shutil.copy(pdf_path, final_pdf_path)
+        template_number = current_template_index + 1
+        current_template_index += 1
+
+    metrics.incr("resume_requests")
+
+    try:
+        if stream:
+            chunks = await stream_pdf(template_number - 1, data, fit_pages)
+            return StreamingResponse(
+                chunks,
+                media_type="application/pdf",
+                headers={"Content-Disposition": f'inline; filename="template_{template_number}.pdf"'}
+            )
+
+        timings = {}
+        render_started = time.perf_counter()
+        try:
+            pdf_path = await render_pool.render(
+                template_number - 1, data,
+                timeout=RENDER_TIMEOUT_SECONDS,
+                is_disconnected=request.is_disconnected,
+                fit_pages=fit_pages,
+                timings=timings,
+            )
+        finally:
+            stages["pool_ms"] = (time.perf_counter() - render_started) * 1000
+            stages.update((name, ms) for name, ms in timings.items() if name.endswith("_ms"))
+
+        copy_started = time.perf_counter()
+        base_pdf_name = f"template_{template_number}.pdf"
+        # hashing, and now and then a quota rescan, keep this off the event loop
+        final_pdf_name = await asyncio.to_thread(pdf_store.publish, pdf_path, base_pdf_name)
+        shutil.rmtree(os.path.dirname(pdf_path), ignore_errors=True)
+        stages["copy_ms"] = (time.perf_counter() - copy_started) * 1000
 
         return {
             "status": "success",
@@ -191,5 +367,179 @@ async def unified_resume(data: dict):
             "download_link": f"http://127.0.0.1:8000/files/{final_pdf_name}"
         }
 
+    except RenderTimeout:
+        metrics.incr("render_timeouts")
+        outcome = "timeout"
+        raise HTTPException(status_code=504, detail="Resume rendering timed out")
+
+    except RenderCancelled:
+        metrics.incr("render_cancelled")
+        outcome = "cancelled"
+        # client disconnected, nobody is left to read a response
+        return Response(status_code=499)
+
     except Exception as e:
+        metrics.incr("render_errors")
+        outcome = "error"
         raise HTTPException(status_code=500, detail=str(e))
+
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if not stream and slow_renders.is_slow(elapsed_ms):
+            options = {"fit_pages": fit_pages, "correct": correct, "language": language, "outcome": outcome}
+            asyncio.get_running_loop().run_in_executor(
+                None, capture_slow_render, template_number, data, elapsed_ms, stages, options
+            )
+
+
+
+
+#  PHOTO UPLOAD (raw image body -> photo id for the resume payload's "photo")
+
+@app.post("/resume/photo")
+async def upload_photo(request: Request):
+    try:
+        raw = await request.body()
+    except ClientDisconnect:
+        # also how the body size limit cuts off an oversized stream (413 already sent)
+        raise HTTPException(status_code=413, detail="Photo too large")
+    if not raw:
+        raise HTTPException(status_code=422, detail="Empty photo")
+    try:
+        photo_id = await asyncio.to_thread(photo_cache.add, raw)
+    except InvalidPhoto as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    metrics.incr("photo_uploads")
+    return {"photo": photo_id}
+
+
+
+
+#  LAYOUT DRY RUN (wrapping + pagination only, nothing is painted or saved)
+
+@app.post("/resume/layout")
+async def resume_layout(
+    payload: ResumeRequest,
+    template: Optional[int] = Query(None, ge=1, le=len(TEMPLATES)),
+):
+    data = payload.to_render_data()
+    numbers = [template] if template is not None else range(1, len(TEMPLATES) + 1)
+
+    def measure():
+        started = time.perf_counter()
+        with render_budget(timeout=RENDER_TIMEOUT_SECONDS):
+            layouts = [
+                {"template": number, **measure_plan(TEMPLATE_PLANS[number - 1], data)}
+                for number in numbers
+            ]
+        return layouts, (time.perf_counter() - started) * 1000
+
+    try:
+        layouts, elapsed_ms = await asyncio.to_thread(measure)
+    except RenderTimeout:
+        raise HTTPException(status_code=504, detail="Layout timed out")
+    except Exception as e:
+        metrics.incr("layout_errors")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    metrics.incr("layout_requests")
+    return {"templates": layouts, "elapsed_ms": round(elapsed_ms, 2)}
+
+
+
+
+#  LIVE PREVIEW (WebSocket; debounced edits, at most one render in flight)
+
+@app.websocket("/resume/live")
+async def resume_live(websocket: WebSocket):
+    await LiveSession(websocket, render_pool, RENDER_TIMEOUT_SECONDS).run()
+
+
+
+#  PREVIEW THUMBNAILS (first page of every template, cached by payload hash)
+
+PREVIEW_CACHE_HEADERS = {"Cache-Control": "public, max-age=31536000, immutable"}
+
+
+@app.post("/resume/previews")
+async def resume_previews(
+    payload: ResumeRequest,
+    width: int = Query(240, ge=64, le=600),
+    inline: bool = False,
+):
+    data = payload.to_render_data()
+
+    def render():
+        with render_budget(timeout=RENDER_TIMEOUT_SECONDS):
+            return render_previews(data, width)
+
+    try:
+        key, pngs = await asyncio.to_thread(render)
+    except RenderTimeout:
+        raise HTTPException(status_code=504, detail="Preview timed out")
+
+    previews = []
+    for number, png in pngs.items():
+        preview = {"template": number, "url": f"/resume/previews/{key}/{number}.png"}
+        if inline:
+            # lets the picker show all seven thumbnails from this one response
+            preview["data_uri"] = "data:image/png;base64," + base64.b64encode(png).decode()
+        previews.append(preview)
+
+    metrics.incr("preview_requests")
+    return {"key": key, "previews": previews}
+
+
+@app.get("/resume/previews/{key}/{number}.png")
+async def get_preview(key: str, number: int, request: Request):
+    etag = f'"{key}-{number}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag, **PREVIEW_CACHE_HEADERS})
+
+    png = preview_cache.get(key, number)
+    if png is None:
+        raise HTTPException(status_code=404, detail="Preview expired, request it again")
+    return Response(png, media_type="image/png", headers={"ETag": etag, **PREVIEW_CACHE_HEADERS})
+
+
+
+#  SLOW RENDER BUNDLES
+
+@app.get("/debug/slow-renders")
+async def list_slow_renders():
+    bundles = await asyncio.to_thread(slow_renders.summaries)
+    return {"threshold_ms": slow_renders.threshold_ms, "bundles": bundles}
+
+
+@app.get("/debug/slow-renders/{bundle_id}")
+async def get_slow_render(bundle_id: str):
+    path = slow_renders.path(bundle_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Bundle not found")
+    return FileResponse(path, media_type="application/json", filename=os.path.basename(path))
+
+
+
+#  METRICS ENDPOINT
+
+@app.get("/metrics")
+async def get_metrics():
+    snapshot = metrics.snapshot()
+    snapshot["render_pool"] = dict(render_pool.stats)
+    snapshot["pdf_store"] = await asyncio.to_thread(pdf_store.usage)
+    snapshot["photos"] = dict(photo_cache.stats)
+    return snapshot
+
+
+# clearing the shared counters is for local tooling (loadtest.py) and API key holders
+LOCAL_CLIENTS = {"127.0.0.1", "::1"}
+
+
+@app.post("/metrics/reset")
+async def reset_metrics(request: Request):
+    client = request.client.host if request.client else None
+    if client not in LOCAL_CLIENTS and request.headers.get("x-api-key") not in API_KEYS:
+        raise HTTPException(status_code=403, detail="Metrics can only be reset locally or with an API key")
+    metrics.reset()
+    return {"status": "reset"}
@@ -0,0 +1,77 @@
+# metrics.py
+
+import time
+import asyncio
+import threading
+from collections import defaultdict, deque
+
+
+
+#   COUNTERS + GAUGES (process-local, exposed on GET /metrics)
+
+
+_lock = threading.Lock()
+COUNTERS = defaultdict(int)
+GAUGES = {}
+
+
+def incr(name, value=1):
+    with _lock:
+        COUNTERS[name] += value
+
+
+def set_gauge(name, value):
+    GAUGES[name] = value
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+
+#   EVENT LOOP LAG
+#
+#   A task sleeps for a fixed interval; anything beyond that interval is time
+#   the loop spent blocked by other work (sync renders, slow handlers, ...).
+
+
+LOOP_LAG_INTERVAL = 0.1
+loop_lag_samples = deque(maxlen=3000)  # ~5 minutes at 100 ms
+
+
+async def monitor_event_loop_lag(interval=LOOP_LAG_INTERVAL):
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag_ms = max(0.0, (time.perf_counter() - started - interval) * 1000)
+        loop_lag_samples.append(lag_ms)
+
+
+def loop_lag_summary():
+    samples = list(loop_lag_samples)
+    return {
+        "samples": len(samples),
+        "p50_ms": round(percentile(samples, 50), 2),
+        "p99_ms": round(percentile(samples, 99), 2),
+        "max_ms": round(max(samples, default=0.0), 2),
+    }
+
+
+def snapshot():
+    with _lock:
+        counters = dict(COUNTERS)
+    return {
+        "counters": counters,
+        "gauges": dict(GAUGES),
+        "event_loop_lag": loop_lag_summary(),
+    }
+
+
+def reset():
+    with _lock:
+        COUNTERS.clear()
+    loop_lag_samples.clear()
@@ -0,0 +1,184 @@
+# pdfstore.py
+
+import os
+import time
+import shutil
+import hashlib
+import secrets
+import threading
+from collections import defaultdict
+
+
+
+#   CONTENT-ADDRESSED PDF STORE
+#
+#   Every distinct PDF is kept once under .objects/<sha256>.pdf inside the
+#   download folder; download names are hard links to it, so the link count
+#   is the refcount and an object with no names left is garbage. Linking
+#   refreshes the object's mtime, which all its names share, so age based
+#   cleanup measures from the last time that content was requested.
+#
+#   Downloads stamp the inode's atime (explicitly, whatever the mount
+#   options), so every process sees the same last-download time. Over the
+#   quota, the least recently downloaded contents go first, names and all.
+
+
+OBJECTS_DIR = ".objects"
+PDF_STORE_QUOTA_MB = int(os.getenv("PDF_STORE_QUOTA_MB", "1024"))
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# objects are only collected once older than this, so one that was just
+# stored is never removed before its first name is linked
+COLLECT_GRACE_SECONDS = 300
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PdfStore:
+
+    def __init__(self, folder, quota_bytes=PDF_STORE_QUOTA_MB * 1024 * 1024):
+        self.folder = folder
+        self.objects = os.path.join(folder, OBJECTS_DIR)
+        os.makedirs(self.objects, exist_ok=True)
+        self.quota_bytes = quota_bytes
+        self.lock = threading.Lock()
+        self.stats = {"stored": 0, "deduplicated": 0, "collected": 0, "link_fallbacks": 0,
+                      "evicted": 0, "evicted_bytes": 0}
+        # running estimate between full scans, other processes add to the disk too
+        self.approx_bytes = self.usage()["stored_bytes"]
+
+    def object_path(self, digest):
+        return os.path.join(self.objects, f"{digest}.pdf")
+
+    def put(self, src_path):
+        # -> digest; src_path is consumed (moved, or removed on a dedup hit)
+        digest = file_digest(src_path)
+        path = self.object_path(digest)
+        with self.lock:
+            if os.path.exists(path):
+                os.utime(path)
+                os.remove(src_path)
+                self.stats["deduplicated"] += 1
+                return digest
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            shutil.move(src_path, tmp_path)  # may cross filesystems
+            os.replace(tmp_path, path)
+            self.stats["stored"] += 1
+            self.approx_bytes += os.path.getsize(path)
+        if self.quota_bytes and self.approx_bytes > self.quota_bytes:
+            self.enforce_quota(keep=path)  # not linked yet, must survive
+        return digest
+
+    def link(self, digest, base_name):
+        # -> download name, a new hard link to the object. Names carry a random
+        # token: an evicted name must never come back serving someone else's PDF
+        name, ext = os.path.splitext(base_name)
+        while True:
+            final_name = f"{name}-{secrets.token_hex(8)}{ext}"
+            target = os.path.join(self.folder, final_name)
+            try:
+                os.link(self.object_path(digest), target)
+                return final_name
+            except FileExistsError:
+                continue
+            except OSError:
+                # no hard links on this filesystem, fall back to a copy
+                if os.path.exists(target):
+                    continue
+                shutil.copyfile(self.object_path(digest), target)
+                self.stats["link_fallbacks"] += 1
+                return final_name
+
+    def publish(self, src_path, base_name):
+        return self.link(self.put(src_path), base_name)
+
+    def touch(self, name):
+        # record a download: bump atime, keep mtime (age based cleanup)
+        path = os.path.join(self.folder, os.path.basename(name))
+        try:
+            stat = os.stat(path)
+            os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+        except FileNotFoundError:
+            pass
+
+    def refcount(self, digest):
+        try:
+            return os.stat(self.object_path(digest)).st_nlink - 1
+        except FileNotFoundError:
+            return 0
+
+    def collect(self):
+        # remove objects no download name links to any more
+        now = time.time()
+        freed = 0
+        with self.lock:
+            for entry in os.scandir(self.objects):
+                if not entry.name.endswith(".pdf"):
+                    continue
+                stat = entry.stat()
+                if stat.st_nlink > 1 or now - stat.st_mtime < COLLECT_GRACE_SECONDS:
+                    continue
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                freed += stat.st_size
+                self.stats["collected"] += 1
+        return freed
+
+    def enforce_quota(self, keep=None):
+        # -> bytes freed; evicts least recently downloaded contents until
+        # the store fits in the quota again (a quota of 0 disables it)
+        freed = 0
+        if not self.quota_bytes:
+            return freed
+        with self.lock:
+            # everything on disk: objects (by inode) and plain files left by
+            # the copy fallback, with the names pointing at each
+            entries = {}
+            names = defaultdict(list)
+            for entry in os.scandir(self.folder):
+                if entry.name.endswith(".pdf") and entry.is_file(follow_symlinks=False):
+                    stat = entry.stat()
+                    names[stat.st_ino].append(entry.path)
+                    entries.setdefault(stat.st_ino, (stat.st_atime, stat.st_size, None))
+            for entry in os.scandir(self.objects):
+                if entry.name.endswith(".pdf"):
+                    stat = entry.stat()
+                    entries[stat.st_ino] = (stat.st_atime, stat.st_size, entry.path)
+
+            total = sum(size for _, size, _ in entries.values())
+            for inode, (_, size, object_path) in sorted(entries.items(), key=lambda item: item[1][0]):
+                if total <= self.quota_bytes:
+                    break
+                if object_path == keep:
+                    continue
+                for path in names.get(inode, []) + ([object_path] if object_path else []):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+                freed += size
+                self.stats["evicted"] += 1
+                self.stats["evicted_bytes"] += size
+            self.approx_bytes = total
+        return freed
+
+    def usage(self):
+        objects = 0
+        stored_bytes = 0
+        names = 0
+        for entry in os.scandir(self.objects):
+            if entry.name.endswith(".pdf"):
+                stat = entry.stat()
+                objects += 1
+                stored_bytes += stat.st_size
+                names += stat.st_nlink - 1
+        return {"objects": objects, "stored_bytes": stored_bytes, "names": names, **self.stats}
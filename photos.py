@@ -0,0 +1,155 @@
+# photos.py
+
+import io
+import os
+import re
+import time
+import hashlib
+import tempfile
+import threading
+
+from PIL import Image, ImageOps
+
+
+
+#   PHOTO CACHE
+#
+#   An upload is decoded once, normalised (orientation, RGB on white, size
+#   cap, no metadata) and stored under the sha256 of the uploaded bytes;
+#   that hash is the photo id resume payloads refer to. Each template slot
+#   size gets its own pre-scaled JPEG, made on first use and shared by every
+#   render process, so a render embeds a small ready-made JPEG that ReportLab
+#   passes through as-is instead of decoding and recompressing the upload.
+
+
+PHOTO_CACHE_DIR = os.getenv("PHOTO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "resume-photos"))
+MAX_PHOTO_BYTES = int(os.getenv("MAX_PHOTO_BYTES", str(5 * 1024 * 1024)))
+PHOTO_MAX_AGE_HOURS = float(os.getenv("PHOTO_MAX_AGE_HOURS", "24"))
+
+# slots are rasterized at this resolution, plenty for print at their size
+PHOTO_DPI = int(os.getenv("PHOTO_DPI", "200"))
+PHOTO_JPEG_QUALITY = 85
+
+MAX_PHOTO_PIXELS = 40_000_000  # decoded size, decompression bomb guard
+PHOTO_SOURCE_SIZE = 1024  # longest side kept of an upload
+
+# faces usually sit above the middle of a portrait
+CROP_CENTERING = (0.5, 0.4)
+
+PHOTO_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class InvalidPhoto(ValueError):
+    pass
+
+
+def slot_pixels(width, height, dpi=PHOTO_DPI):
+    # slot size in points -> pixels
+    return max(1, round(width * dpi / 72)), max(1, round(height * dpi / 72))
+
+
+def flatten(image):
+    # transparent areas become white, not black
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def write_jpeg(image, path):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    image.save(tmp_path, "JPEG", quality=PHOTO_JPEG_QUALITY, optimize=True)
+    os.replace(tmp_path, path)  # readers never see a partial file
+
+
+class PhotoCache:
+
+    def __init__(self, folder=PHOTO_CACHE_DIR):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        self.stats = {"uploaded": 0, "deduplicated": 0, "scaled": 0, "scaled_hits": 0, "collected": 0}
+
+    def source_path(self, photo_id):
+        return os.path.join(self.folder, f"{photo_id}.jpg")
+
+    def scaled_path(self, photo_id, size):
+        return os.path.join(self.folder, f"{photo_id}_{size[0]}x{size[1]}.jpg")
+
+    def add(self, raw):
+        # -> photo id; raises InvalidPhoto for anything that isn't a usable image
+        if len(raw) > MAX_PHOTO_BYTES:
+            raise InvalidPhoto(f"photo exceeds {MAX_PHOTO_BYTES} bytes")
+        photo_id = hashlib.sha256(raw).hexdigest()
+        if self.touch(photo_id):
+            self.stats["deduplicated"] += 1
+            return photo_id
+
+        try:
+            with Image.open(io.BytesIO(raw)) as image:
+                if image.width * image.height > MAX_PHOTO_PIXELS:
+                    raise InvalidPhoto("photo dimensions are too large")
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail((PHOTO_SOURCE_SIZE, PHOTO_SOURCE_SIZE), Image.LANCZOS)
+                image = flatten(image)
+        except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+            raise InvalidPhoto("unreadable image") from e
+
+        write_jpeg(image, self.source_path(photo_id))
+        self.stats["uploaded"] += 1
+        return photo_id
+
+    def add_file(self, path):
+        with open(path, "rb") as f:
+            return self.add(f.read(MAX_PHOTO_BYTES + 1))
+
+    def touch(self, photo_id):
+        # -> whether the photo is cached; use keeps it from being collected
+        if not PHOTO_ID_PATTERN.match(photo_id or ""):
+            return False
+        try:
+            os.utime(self.source_path(photo_id))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def scaled(self, photo_id, width, height):
+        # -> path of the photo cropped + scaled to a width x height pt slot,
+        # or None if the photo is unknown (or already collected)
+        if not PHOTO_ID_PATTERN.match(photo_id or ""):
+            return None
+        size = slot_pixels(width, height)
+        path = self.scaled_path(photo_id, size)
+        if os.path.exists(path):
+            self.stats["scaled_hits"] += 1
+            return path
+
+        try:
+            with Image.open(self.source_path(photo_id)) as image:
+                image = ImageOps.fit(image, size, Image.LANCZOS, centering=CROP_CENTERING)
+        except FileNotFoundError:
+            return None
+        write_jpeg(image, path)
+        self.stats["scaled"] += 1
+        return path
+
+    def collect(self, max_age_hours=PHOTO_MAX_AGE_HOURS):
+        # drop photos no request used for max_age_hours, with all their sizes
+        now = time.time()
+        expired = set()
+        for entry in os.scandir(self.folder):
+            photo_id = entry.name[:64]
+            if entry.name == f"{photo_id}.jpg" and now - entry.stat().st_mtime > max_age_hours * 3600:
+                expired.add(photo_id)
+        for entry in os.scandir(self.folder):
+            if entry.name[:64] in expired:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+        self.stats["collected"] += len(expired)
+        return len(expired)
+
+
+photo_cache = PhotoCache()
@@ -0,0 +1,72 @@
+# previews.py
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from templates import TEMPLATE_PLANS, preview_png
+
+
+
+#   PREVIEW CACHE (PNG bytes, LRU by total size)
+
+
+PREVIEW_CACHE_BYTES = int(os.getenv("PREVIEW_CACHE_BYTES", str(64 * 1024 * 1024)))
+PREVIEW_WIDTH_PX = int(os.getenv("PREVIEW_WIDTH_PX", "240"))
+
+
+def payload_key(data, width_px):
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    digest = hashlib.sha256(canonical.encode("utf-8"))
+    digest.update(f"|{width_px}".encode())
+    return digest.hexdigest()[:32]
+
+
+class PreviewCache:
+
+    def __init__(self, max_bytes=PREVIEW_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, template_number):
+        with self.lock:
+            png = self.entries.get((key, template_number))
+            if png is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end((key, template_number))
+            self.hits += 1
+            return png
+
+    def put(self, key, template_number, png):
+        with self.lock:
+            old = self.entries.pop((key, template_number), None)
+            if old is not None:
+                self.total_bytes -= len(old)
+            self.entries[(key, template_number)] = png
+            self.total_bytes += len(png)
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= len(evicted)
+
+
+preview_cache = PreviewCache()
+
+
+def render_previews(data, width_px=PREVIEW_WIDTH_PX):
+    # -> (key, {template number: png bytes}); only cache misses are rendered
+    key = payload_key(data, width_px)
+    pngs = {}
+    for number, plan in enumerate(TEMPLATE_PLANS, start=1):
+        png = preview_cache.get(key, number)
+        if png is None:
+            png = preview_png(plan, data, width_px)
+            preview_cache.put(key, number, png)
+        pngs[number] = png
+    return key, pngs
@@ -0,0 +1,423 @@
+# render_pool.py
+
+import os
+import time
+import queue
+import shutil
+import asyncio
+import threading
+import itertools
+import multiprocessing
+from concurrent.futures import Future
+
+# importing templates registers fonts and compiles every layout, so each
+# spawned worker pays that cost once at startup
+from templates import (
+    TEMPLATES, TEMPLATE_PLANS, generate_fitted, fit_plan, write_resume,
+    RenderTimeout, RenderCancelled, render_budget, check_deadline,
+)
+from slowlog import profile_call
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+
+#   POOL SETTINGS
+
+
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+RENDER_MAX_RENDERS = int(os.getenv("RENDER_MAX_RENDERS", "200"))
+RENDER_MAX_RSS_MB = int(os.getenv("RENDER_MAX_RSS_MB", "512"))
+RENDER_PIN_CPUS = os.getenv("RENDER_PIN_CPUS", "0") == "1"
+
+# a worker still busy this long past a job's deadline is killed and replaced
+RENDER_KILL_GRACE = float(os.getenv("RENDER_KILL_GRACE", "5"))
+
+# workers dying before they are ready (bad fonts, import errors) are
+# respawned with exponential backoff; start() gives up after this many
+RENDER_START_FAILURES = int(os.getenv("RENDER_START_FAILURES", "3"))
+RENDER_RESPAWN_BACKOFF = 0.5
+RENDER_RESPAWN_BACKOFF_MAX = 30.0
+
+CANCEL_RING_SIZE = 64
+
+WARMUP_DATA = {
+    "full_name": "Warm Up",
+    "job_role": "Engineer",
+    "email": "warm@up.dev",
+    "phone": "+1 555 000 0000",
+    "skills": "Python",
+    "languages": "English",
+    "certifications": "None",
+    "profile_summary": "Warm up render.",
+    "work_experience": "Warm up render.",
+    "education": "Warm up render.",
+    "interests": "Warm up render.",
+}
+
+
+class RenderError(Exception):
+    pass
+
+
+ERROR_TYPES = {"error": RenderError, "timeout": RenderTimeout, "cancelled": RenderCancelled}
+
+
+
+#   WORKER PROCESS
+
+
+def current_rss_mb():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    try:
+        import resource
+        # peak RSS (KiB on Linux), good enough as a ceiling check
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return 0.0
+
+
+def pin_worker_cpu(worker_id):
+    if not hasattr(os, "sched_setaffinity"):
+        return
+    cpus = sorted(os.sched_getaffinity(0))
+    if cpus:
+        os.sched_setaffinity(0, {cpus[worker_id % len(cpus)]})
+
+
+def render_job(template_index, data, fit_pages, stream_to=None):
+    if stream_to:
+        return stream_job(template_index, data, fit_pages, stream_to)
+    if fit_pages:
+        return generate_fitted(template_index, data, fit_pages)
+    return TEMPLATES[template_index](data)
+
+
+def stream_job(template_index, data, fit_pages, stream_to):
+    # the PDF goes into the caller's FIFO as it is saved, nothing lands on disk
+    plan = TEMPLATE_PLANS[template_index]
+    if fit_pages:
+        plan, _ = fit_plan(template_index, data, fit_pages)
+    fd = os.open(stream_to, os.O_WRONLY | os.O_NONBLOCK)  # ENXIO once the reader is gone
+    os.set_blocking(fd, True)
+    with os.fdopen(fd, "wb") as f:
+        write_resume(plan, data, f)
+    return None
+
+
+def render_worker_main(worker_id, task_queue, result_queue, cancel_ring,
+                       max_renders, max_rss_mb, pin_cpu):
+    if pin_cpu:
+        pin_worker_cpu(worker_id)
+
+    for generate in TEMPLATES:
+        try:
+            path = generate(dict(WARMUP_DATA))
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+        except Exception:
+            pass
+
+    result_queue.put(("ready", worker_id, os.getpid()))
+
+    renders = 0
+    while True:
+        job = task_queue.get()
+        if job is None:
+            break
+
+        job_id, template_index, data, deadline, fit_pages, profile, stream_to = job
+        if job_id in cancel_ring[:]:
+            # caller already gave up while the job was queued
+            result_queue.put(("skipped", worker_id, job_id))
+            continue
+
+        result_queue.put(("start", worker_id, job_id))
+        try:
+            with render_budget(
+                deadline=deadline,
+                cancelled=lambda: job_id in cancel_ring[:],
+            ):
+                check_deadline()  # may have expired while queued
+                started = time.perf_counter()
+                profile_text = None
+                if profile:
+                    path, profile_text = profile_call(render_job, template_index, data, fit_pages, stream_to)
+                else:
+                    path = render_job(template_index, data, fit_pages, stream_to)
+                render_ms = (time.perf_counter() - started) * 1000
+            result_queue.put(("done", worker_id, job_id, path,
+                              {"render_ms": render_ms, "profile": profile_text}))
+        except RenderTimeout as e:
+            result_queue.put(("error", worker_id, job_id, str(e), "timeout"))
+        except RenderCancelled as e:
+            result_queue.put(("error", worker_id, job_id, str(e), "cancelled"))
+        except Exception as e:
+            result_queue.put(("error", worker_id, job_id, str(e), "error"))
+
+        renders += 1
+        if renders >= max_renders or current_rss_mb() > max_rss_mb:
+            result_queue.put(("retire", worker_id, os.getpid()))
+            break
+
+
+
+#   RENDER POOL (pre-warmed, recycled workers)
+
+
+class RenderPool:
+
+    def __init__(self, workers=RENDER_WORKERS, max_renders=RENDER_MAX_RENDERS,
+                 max_rss_mb=RENDER_MAX_RSS_MB, pin_cpus=RENDER_PIN_CPUS):
+        self.workers = max(1, workers)
+        self.max_renders = max_renders
+        self.max_rss_mb = max_rss_mb
+        self.pin_cpus = pin_cpus
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._task_queue = None
+        self._result_queue = None
+        self._cancel_ring = None
+        self._cancel_pos = 0
+        self._procs = {}
+        self._in_flight = {}
+        self._deadlines = {}
+        self._timings = {}
+        self._pending = {}
+        self._job_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._ready = threading.Semaphore(0)
+        self._ready_workers = set()
+        self._start_failures = {}
+        self._respawn_at = {}
+        self._start_error = None
+        self._starting = False
+        self._supervisor = None
+        self._running = False
+
+        self.stats = {"renders": 0, "errors": 0, "timeouts": 0, "cancelled": 0,
+                      "recycled": 0, "crashed": 0, "killed": 0}
+
+    def start(self, wait=True, timeout=300):
+        if self._running:
+            return
+        self._running = True
+        self._task_queue = self._ctx.Queue()
+        self._result_queue = self._ctx.Queue()
+        self._cancel_ring = self._ctx.Array("q", CANCEL_RING_SIZE, lock=False)
+
+        for worker_id in range(self.workers):
+            self._spawn(worker_id)
+
+        self._supervisor = threading.Thread(target=self._supervise, daemon=True)
+        self._supervisor.start()
+
+        # block until every worker has fonts/templates loaded and a warm-up render done
+        if wait:
+            self._starting = True
+            try:
+                for _ in range(self.workers):
+                    if not self._ready.acquire(timeout=timeout):
+                        self.shutdown()
+                        raise RenderError("render workers failed to start")
+                    if self._start_error is not None:
+                        self.shutdown()
+                        raise self._start_error
+            finally:
+                self._starting = False
+
+    def shutdown(self):
+        if not self._running:
+            return
+        self._running = False
+        for _ in self._procs:
+            self._task_queue.put(None)
+        for proc in list(self._procs.values()):
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        self._procs.clear()
+
+        with self._lock:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(RenderError("render pool shut down"))
+            self._pending.clear()
+            self._timings.clear()
+            self._deadlines.clear()
+            self._in_flight.clear()
+
+    def submit(self, template_index, data, timeout=None, fit_pages=None, profile=False, stream_to=None):
+        # the future gets .job_id now and .timings (queued_ms, render_ms,
+        # profile) once it resolves; with stream_to (a FIFO already open for
+        # reading) the PDF is written there and the result is None
+        if not self._running:
+            raise RenderError("render pool is not running")
+        deadline = time.time() + timeout if timeout else None
+        future = Future()
+        with self._lock:
+            job_id = next(self._job_ids)
+            self._pending[job_id] = future
+            self._deadlines[job_id] = deadline
+            self._timings[job_id] = {"submitted": time.monotonic()}
+        future.job_id = job_id
+        future.timings = {}
+        self._task_queue.put((job_id, template_index, data, deadline, fit_pages, profile, stream_to))
+        return future
+
+    def cancel(self, job_id):
+        # workers poll the ring from their draw loops; queued jobs are
+        # dropped as soon as a worker picks them up
+        with self._lock:
+            self._cancel_ring[self._cancel_pos % CANCEL_RING_SIZE] = job_id
+            self._cancel_pos += 1
+            if job_id in self._deadlines:
+                # a worker that doesn't notice (stuck in save()) is killed
+                # RENDER_KILL_GRACE from now, whatever the original deadline
+                deadline = self._deadlines[job_id]
+                self._deadlines[job_id] = time.time() if deadline is None else min(deadline, time.time())
+        self._finish(job_id, error="Render cancelled", kind="cancelled")
+
+    async def render(self, template_index, data, timeout=None, is_disconnected=None,
+                     poll_interval=0.25, fit_pages=None, timings=None):
+        future = self.submit(template_index, data, timeout, fit_pages)
+        waiter = asyncio.wrap_future(future)
+        try:
+            while True:
+                done, _ = await asyncio.wait({waiter}, timeout=poll_interval)
+                if done:
+                    if timings is not None:
+                        timings.update(future.timings)
+                    return waiter.result()
+                if is_disconnected is not None and await is_disconnected():
+                    self.cancel(future.job_id)
+                    return await waiter
+        except asyncio.CancelledError:
+            self.cancel(future.job_id)
+            raise
+
+    def _spawn(self, worker_id):
+        proc = self._ctx.Process(
+            target=render_worker_main,
+            args=(worker_id, self._task_queue, self._result_queue, self._cancel_ring,
+                  self.max_renders, self.max_rss_mb, self.pin_cpus),
+            daemon=True,
+        )
+        proc.start()
+        self._procs[worker_id] = proc
+        self._ready_workers.discard(worker_id)
+
+    def _finish(self, job_id, path=None, error=None, kind="error", timings=None):
+        with self._lock:
+            future = self._pending.pop(job_id, None)
+            job_timings = self._timings.pop(job_id, {})
+        if future is None or future.done():
+            return
+        job_timings.pop("submitted", None)
+        future.timings = {**job_timings, **(timings or {})}
+        if error is None:
+            self.stats["renders"] += 1
+            future.set_result(path)
+        else:
+            self.stats[{"timeout": "timeouts", "cancelled": "cancelled"}.get(kind, "errors")] += 1
+            future.set_exception(ERROR_TYPES[kind](error))
+
+    def _respawn(self, worker_id, pid):
+        proc = self._procs.get(worker_id)
+        if proc is None or proc.pid != pid:
+            return  # already replaced
+        proc.join(timeout=5)
+        if self._running:
+            self._spawn(worker_id)
+
+    def _supervise(self):
+        last_check = time.monotonic()
+        while self._running:
+            if time.monotonic() - last_check >= 0.5:
+                self._check_workers()
+                last_check = time.monotonic()
+            try:
+                msg = self._result_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            kind, worker_id = msg[0], msg[1]
+
+            if kind == "ready":
+                self._ready_workers.add(worker_id)
+                self._start_failures.pop(worker_id, None)
+                self._ready.release()
+            elif kind == "start":
+                self._in_flight[worker_id] = msg[2]
+                with self._lock:
+                    job_timings = self._timings.get(msg[2])
+                    if job_timings is not None:
+                        job_timings["queued_ms"] = (time.monotonic() - job_timings["submitted"]) * 1000
+            elif kind == "done":
+                self._job_ended(worker_id, msg[2])
+                self._finish(msg[2], path=msg[3], timings=msg[4])
+            elif kind == "error":
+                self._job_ended(worker_id, msg[2])
+                self._finish(msg[2], error=msg[3], kind=msg[4])
+            elif kind == "skipped":
+                self._job_ended(None, msg[2])
+            elif kind == "retire":
+                self.stats["recycled"] += 1
+                self._respawn(worker_id, msg[2])
+
+    def _job_ended(self, worker_id, job_id):
+        # the deadline outlives the future: the watchdog needs it until the
+        # worker itself is done with the job, cancelled or not
+        self._in_flight.pop(worker_id, None)
+        with self._lock:
+            self._deadlines.pop(job_id, None)
+
+    def _check_workers(self):
+        now = time.time()
+        for worker_id, proc in list(self._procs.items()):
+            if not self._running:
+                return
+            job_id = self._in_flight.get(worker_id)
+
+            if proc.is_alive():
+                # cooperative checks did not fire (e.g. stuck inside save())
+                deadline = self._deadlines.get(job_id) if job_id is not None else None
+                if deadline is None or now < deadline + RENDER_KILL_GRACE:
+                    continue
+                self.stats["killed"] += 1
+                proc.terminate()
+                proc.join(timeout=5)
+                self._job_ended(worker_id, job_id)
+                self._finish(job_id, error="Render exceeded its deadline", kind="timeout")
+            else:
+                if worker_id in self._respawn_at:
+                    # backing off after startup deaths
+                    if now < self._respawn_at[worker_id]:
+                        continue
+                    del self._respawn_at[worker_id]
+                    self._respawn(worker_id, proc.pid)
+                    continue
+
+                self.stats["crashed"] += 1
+                self._job_ended(worker_id, job_id)
+                if job_id is not None:
+                    self._finish(job_id, error="render worker crashed")
+
+                if worker_id not in self._ready_workers:
+                    failures = self._start_failures[worker_id] = self._start_failures.get(worker_id, 0) + 1
+                    if failures >= RENDER_START_FAILURES and self._starting and self._start_error is None:
+                        self._start_error = RenderError(
+                            f"render worker {worker_id} died {failures} times before it was ready "
+                            f"(exit code {proc.exitcode})"
+                        )
+                        self._ready.release()  # wake start() now, not after its timeout
+                    backoff = RENDER_RESPAWN_BACKOFF * 2 ** (failures - 1)
+                    self._respawn_at[worker_id] = now + min(backoff, RENDER_RESPAWN_BACKOFF_MAX)
+                    continue
+
+            self._respawn(worker_id, proc.pid)
@@ -0,0 +1,144 @@
+# schemas.py
+
+import os
+import json
+from typing import Optional
+
+from pydantic import BaseModel, constr, validator
+
+from templates import is_valid_email, is_valid_phone
+from photos import photo_cache, PHOTO_ID_PATTERN
+
+
+
+#   PAYLOAD LIMITS
+
+
+MAX_BODY_BYTES = int(os.getenv("MAX_BODY_BYTES", str(64 * 1024)))
+
+ShortText = constr(strip_whitespace=True, max_length=100)
+HeaderText = constr(strip_whitespace=True, max_length=60)
+ListText = constr(max_length=2000)
+BodyText = constr(max_length=5000)
+LongText = constr(max_length=15000)
+
+
+
+#   RESUME REQUEST MODEL
+
+
+class ResumeRequest(BaseModel):
+    full_name: constr(strip_whitespace=True, min_length=1, max_length=100)
+    job_role: Optional[ShortText] = None
+    email: Optional[constr(strip_whitespace=True, max_length=254)] = None
+    phone: Optional[constr(strip_whitespace=True, max_length=32)] = None
+
+    skills: Optional[ListText] = None
+    languages: Optional[ListText] = None
+    certifications: Optional[ListText] = None
+    profile_summary: Optional[BodyText] = None
+    work_experience: Optional[LongText] = None
+    education: Optional[BodyText] = None
+    interests: Optional[ListText] = None
+
+    # id returned by POST /resume/photo
+    photo: Optional[constr(regex=PHOTO_ID_PATTERN.pattern)] = None
+
+    skills_header: Optional[HeaderText] = None
+    languages_header: Optional[HeaderText] = None
+    certifications_header: Optional[HeaderText] = None
+    profile_summary_header: Optional[HeaderText] = None
+    work_experience_header: Optional[HeaderText] = None
+    education_header: Optional[HeaderText] = None
+    interests_header: Optional[HeaderText] = None
+
+    class Config:
+        extra = "ignore"
+
+    @validator("email")
+    def check_email(cls, value):
+        if value and not is_valid_email(value):
+            raise ValueError("invalid email address")
+        return value
+
+    @validator("phone")
+    def check_phone(cls, value):
+        if value and not is_valid_phone(value):
+            raise ValueError("invalid phone number")
+        return value
+
+    @validator("photo")
+    def check_photo(cls, value):
+        if value and not photo_cache.touch(value):
+            raise ValueError("unknown photo, upload it to /resume/photo first")
+        return value
+
+    def to_render_data(self):
+        # templates read optional fields with data.get(), so drop the unset ones
+        return self.dict(exclude_none=True)
+
+
+
+#   BODY SIZE LIMIT (ASGI middleware, runs before the body is parsed)
+
+
+class BodySizeLimitMiddleware:
+
+    def __init__(self, app, max_bytes=MAX_BODY_BYTES, path_limits=None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = path_limits or {}  # exact path -> its own limit
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = self.path_limits.get(scope["path"], self.max_bytes)
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > max_bytes:
+                await self.reject(send, max_bytes)
+                return
+
+        # streamed (chunked) bodies: the 413 is sent from here as soon as the
+        # limit trips, the app only sees the client go away. An exception
+        # raised into the app would be turned into a 400 by FastAPI's body reader.
+        received = 0
+        rejected = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    rejected = True
+                    if not response_started:
+                        await self.reject(send, max_bytes)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if rejected:
+                return  # the 413 is already out, drop whatever the app answers
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+    async def reject(self, send, max_bytes):
+        body = json.dumps({"detail": f"Payload exceeds {max_bytes} bytes"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,209 @@
+# slowlog.py
+
+import io
+import os
+import json
+import time
+import uuid
+import pstats
+import cProfile
+import threading
+import unicodedata
+
+
+
+#   SLOW RENDER CAPTURE
+#
+#   Requests slower than SLOW_RENDER_MS leave a reproduction bundle: template
+#   and options, per-stage timings, the shape of every field and a payload
+#   with the same shape but none of the text. Bundles are JSON files in a
+#   ring buffer on disk, served by /debug/slow-renders.
+
+
+SLOW_RENDER_MS = float(os.getenv("SLOW_RENDER_MS", "2000"))
+SLOW_CAPTURE_DIR = os.getenv("SLOW_CAPTURE_DIR", "slow-renders")
+SLOW_CAPTURE_KEEP = int(os.getenv("SLOW_CAPTURE_KEEP", "50"))
+
+# a capture replays the shaped payload under cProfile at most this often
+SLOW_PROFILE_INTERVAL = float(os.getenv("SLOW_PROFILE_INTERVAL", "30"))
+PROFILE_TOP_FUNCTIONS = 40
+
+
+
+#   PAYLOAD SHAPES (no user text leaves this module)
+
+
+REPLAY_EMAIL = "slow.render@example.com"
+
+
+def anonymize_text(text):
+    # keeps length, word/line structure, punctuation and script, drops content
+    out = []
+    for ch in text:
+        if ch.isascii():
+            if ch.islower():
+                out.append("x")
+            elif ch.isupper():
+                out.append("X")
+            elif ch.isdigit():
+                out.append("9")
+            else:
+                out.append(ch)  # whitespace + ASCII punctuation
+        elif ch.isspace():
+            out.append(ch)
+        elif unicodedata.east_asian_width(ch) in ("W", "F"):
+            out.append("一")
+        elif ord(ch) > 0xFFFF:
+            out.append("\U0001F600")
+        else:
+            out.append("é")
+    return "".join(out)
+
+
+def field_shape(text):
+    lines = text.split("\n")
+    words = text.split()
+    return {
+        "chars": len(text),
+        "lines": len(lines),
+        "words": len(words),
+        "longest_line": max(map(len, lines), default=0),
+        "longest_word": max(map(len, words), default=0),
+        "non_ascii": sum(not ch.isascii() for ch in text),
+    }
+
+
+def shape_payload(data):
+    return {key: field_shape(value) for key, value in data.items() if isinstance(value, str)}
+
+
+def anonymize_payload(data):
+    replay = {}
+    for key, value in data.items():
+        if not isinstance(value, str) or key == "photo":
+            continue  # the photo is the user's own image, replays go without
+        if key == "email":
+            replay[key] = REPLAY_EMAIL  # must stay a valid address
+        else:
+            replay[key] = anonymize_text(value)
+    return replay
+
+
+
+#   PROFILING
+
+
+def profile_call(fn, *args, **kwargs):
+    # -> (result, text of the top functions by cumulative time)
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn, *args, **kwargs)
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.strip_dirs().sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    return result, out.getvalue()
+
+
+
+#   RING BUFFER (one JSON file per bundle, oldest removed first)
+
+
+class SlowRenderLog:
+
+    def __init__(self, folder=SLOW_CAPTURE_DIR, keep=SLOW_CAPTURE_KEEP,
+                 threshold_ms=SLOW_RENDER_MS, profile_interval=SLOW_PROFILE_INTERVAL):
+        self.folder = folder
+        self.keep = keep
+        self.threshold_ms = threshold_ms
+        self.profile_interval = profile_interval
+        self.last_profile = 0.0
+        self.lock = threading.Lock()
+
+    def is_slow(self, elapsed_ms):
+        return self.threshold_ms > 0 and elapsed_ms >= self.threshold_ms
+
+    def claim_profile(self):
+        # rate limit on replays, they cost a full render each
+        with self.lock:
+            now = time.monotonic()
+            if now - self.last_profile < self.profile_interval:
+                return False
+            self.last_profile = now
+            return True
+
+    def capture(self, template_number, data, elapsed_ms, stages, options=None):
+        bundle_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        bundle = {
+            "id": bundle_id,
+            "captured_at": time.time(),
+            "template": template_number,
+            "options": options or {},
+            "elapsed_ms": round(elapsed_ms, 1),
+            "stages_ms": {name: round(ms, 1) for name, ms in stages.items()},
+            "shape": shape_payload(data),
+            "replay_payload": anonymize_payload(data),
+            "profile": None,
+        }
+        self.write(bundle)
+        self.trim()
+        return bundle_id
+
+    def attach_profile(self, bundle_id, profile, replay_ms):
+        bundle = self.load(bundle_id)
+        if bundle is None:
+            return  # already rotated out
+        bundle["profile"] = profile
+        bundle["replay_ms"] = round(replay_ms, 1)
+        self.write(bundle)
+
+    def path(self, bundle_id):
+        name = os.path.basename(bundle_id)
+        return os.path.join(self.folder, f"{name}.json")
+
+    def write(self, bundle):
+        os.makedirs(self.folder, exist_ok=True)
+        path = self.path(bundle["id"])
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(bundle, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+
+    def load(self, bundle_id):
+        try:
+            with open(self.path(bundle_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def bundle_ids(self):
+        # ids start with a timestamp, so name order is capture order
+        try:
+            names = os.listdir(self.folder)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith(".json"))
+
+    def trim(self):
+        for bundle_id in self.bundle_ids()[:-self.keep or None]:
+            try:
+                os.remove(self.path(bundle_id))
+            except FileNotFoundError:
+                pass
+
+    def summaries(self):
+        out = []
+        for bundle_id in reversed(self.bundle_ids()):
+            bundle = self.load(bundle_id)
+            if bundle is None:
+                continue
+            out.append({
+                "id": bundle_id,
+                "captured_at": bundle["captured_at"],
+                "template": bundle["template"],
+                "elapsed_ms": bundle["elapsed_ms"],
+                "stages_ms": bundle["stages_ms"],
+                "profiled": bundle["profile"] is not None,
+            })
+        return out
+
+
+slow_renders = SlowRenderLog()
@@ -0,0 +1,251 @@
+# spelling.py
+
+import os
+import sys
+import mmap
+import zlib
+import heapq
+import struct
+import tempfile
+import threading
+
+
+
+#   SYMMETRIC-DELETE INDEX
+#
+#   Every dictionary word is stored under all strings reachable from it by up
+#   to MAX_DISTANCE deletions. A misspelling is looked up by its own deletes,
+#   so candidates are found without generating inserts/replaces, and every
+#   candidate is verified with a real edit distance.
+#
+#   On disk (little endian, mapped read-only so worker processes share it):
+#     header   magic, version, max distance, word count, entry count
+#     offsets  (words + 1) x u32 into the word blob
+#     counts   words x u32 frequency
+#     entries  entries x (u32 crc32 of the delete, u32 word id), sorted
+#     blob     utf-8 words
+#
+#   Building takes seconds and is never done while serving: run
+#   `python spelling.py <word list>...` offline, or let the app build missing
+#   indexes in the background at startup. Entries are sorted in chunks of
+#   BUILD_CHUNK_ENTRIES spilled to disk and merged, so memory stays bounded
+#   however large the word list.
+
+
+INDEX_MAGIC = b"SYMD"
+INDEX_VERSION = 1
+HEADER = struct.Struct("<4sIIII")
+MAX_DISTANCE = int(os.getenv("SPELLING_MAX_DISTANCE", "2"))
+INDEX_DIR = os.getenv("SPELLING_INDEX_DIR", os.path.join(tempfile.gettempdir(), "resume-spelling"))
+BUILD_CHUNK_ENTRIES = 500_000
+
+
+def deletes(word, distance):
+    found = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w)) if len(w) > 1}
+        found |= frontier
+    return found
+
+
+def edit_distance(a, b, limit):
+    # optimal string alignment (adjacent transpositions count as one edit)
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def read_wordlist(path):
+    # "word" or "word count" per line -> {word: count}
+    counts = {}
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            word = parts[0].lower()
+            count = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 1
+            counts[word] = counts.get(word, 0) + count
+    return counts
+
+
+def spill_sorted(keys, folder):
+    # -> path of a temp file holding keys sorted, as little endian u64
+    keys.sort()
+    fd, path = tempfile.mkstemp(suffix=".keys", dir=folder)
+    with os.fdopen(fd, "wb") as f:
+        f.write(struct.pack(f"<{len(keys)}Q", *keys))
+    return path
+
+
+def read_keys(path, batch=65536):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(batch * 8)
+            if not chunk:
+                return
+            yield from struct.unpack(f"<{len(chunk) // 8}Q", chunk)
+
+
+def build_index(wordlist_path, index_path, max_distance=MAX_DISTANCE):
+    counts = read_wordlist(wordlist_path)
+    words = sorted(counts)
+
+    blob = bytearray()
+    offsets = [0]
+    for word in words:
+        blob += word.encode("utf-8")
+        offsets.append(len(blob))
+
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(index_path))) as spill_dir:
+        # entry (crc, word id) as one int crc << 32 | word id sorts the same way
+        chunks, keys, n_entries = [], [], 0
+        for word_id, word in enumerate(words):
+            keys.extend(zlib.crc32(d.encode("utf-8")) << 32 | word_id for d in deletes(word, max_distance))
+            if len(keys) >= BUILD_CHUNK_ENTRIES:
+                n_entries += len(keys)
+                chunks.append(spill_sorted(keys, spill_dir))
+                keys = []
+        if keys:
+            n_entries += len(keys)
+            chunks.append(spill_sorted(keys, spill_dir))
+            keys = []
+
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, max_distance, len(words), n_entries))
+            f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+            f.write(struct.pack(f"<{len(words)}I", *(min(counts[w], 2 ** 32 - 1) for w in words)))
+            batch = []
+            for key in heapq.merge(*(read_keys(path) for path in chunks)):
+                # swap halves: little endian u64 of the result is crc, then word id
+                batch.append((key & 0xFFFFFFFF) << 32 | key >> 32)
+                if len(batch) == 65536:
+                    f.write(struct.pack("<65536Q", *batch))
+                    batch = []
+            f.write(struct.pack(f"<{len(batch)}Q", *batch))
+            f.write(blob)
+    os.replace(tmp_path, index_path)  # readers never see a partial index
+
+
+class SymDeleteIndex:
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.max_distance, n_words, n_entries = HEADER.unpack_from(self.mm)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"{path} is not a spelling index")
+
+        view = memoryview(self.mm)
+        pos = HEADER.size
+        self.offsets = view[pos:pos + (n_words + 1) * 4].cast("I")
+        pos += (n_words + 1) * 4
+        self.counts = view[pos:pos + n_words * 4].cast("I")
+        pos += n_words * 4
+        self.entries = view[pos:pos + n_entries * 8].cast("I")
+        pos += n_entries * 8
+        self.blob = view[pos:]
+        self.n_entries = n_entries
+
+    def word(self, word_id):
+        return bytes(self.blob[self.offsets[word_id]:self.offsets[word_id + 1]]).decode("utf-8")
+
+    def word_ids(self, key):
+        # binary search for the first entry with this hash, then scan
+        h = zlib.crc32(key.encode("utf-8"))
+        entries = self.entries
+        low, high = 0, self.n_entries
+        while low < high:
+            mid = (low + high) // 2
+            if entries[mid * 2] < h:
+                low = mid + 1
+            else:
+                high = mid
+        while low < self.n_entries and entries[low * 2] == h:
+            yield entries[low * 2 + 1]
+            low += 1
+
+    def contains(self, word):
+        return any(self.word(word_id) == word for word_id in self.word_ids(word))
+
+    def suggest(self, word, max_distance=None):
+        # -> closest known word (ties go to the more frequent), or None
+        limit = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        best = None
+        seen = set()
+        for key in deletes(word, limit):
+            for word_id in self.word_ids(key):
+                if word_id in seen:
+                    continue
+                seen.add(word_id)
+                candidate = self.word(word_id)
+                distance = edit_distance(word, candidate, limit)
+                if distance > limit:
+                    continue
+                rank = (distance, -self.counts[word_id])
+                if best is None or rank < best[0]:
+                    best = (rank, candidate)
+        return best[1] if best else None
+
+
+
+#   INDEX CACHE (built once per word list, mapped once per process)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def index_path(wordlist_path, max_distance=MAX_DISTANCE):
+    name = f"{zlib.crc32(os.path.abspath(wordlist_path).encode()):08x}_d{max_distance}.symdel"
+    return os.path.join(INDEX_DIR, name)
+
+
+def index_is_current(wordlist_path, max_distance=MAX_DISTANCE):
+    path = index_path(wordlist_path, max_distance)
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(wordlist_path)
+
+
+def ensure_index(wordlist_path, max_distance=MAX_DISTANCE):
+    # offline / startup step: build the index unless an up to date one exists
+    if not index_is_current(wordlist_path, max_distance):
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        build_index(wordlist_path, index_path(wordlist_path, max_distance), max_distance)
+
+
+def load_index(wordlist_path, max_distance=MAX_DISTANCE):
+    # maps an index ensure_index() built; LookupError until it exists
+    with _indexes_lock:
+        index = _indexes.get(wordlist_path)
+        if index is not None:
+            return index
+        if not index_is_current(wordlist_path, max_distance):
+            raise LookupError(f"spelling index for {wordlist_path} is not built yet")
+        index = _indexes[wordlist_path] = SymDeleteIndex(index_path(wordlist_path, max_distance))
+        return index
+
+
+
+#   CLI (python spelling.py /usr/share/dict/words wordlists/de.txt)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python spelling.py <word list>...")
+    for path in sys.argv[1:]:
+        ensure_index(path)
+        print(f"{path} -> {index_path(path)}")